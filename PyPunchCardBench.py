@@ -0,0 +1,296 @@
+#!/bin/python
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import PyPunchCardCore
+from PyPunchCardCore import BinaryTaskStore, PunchCardGrapher, SqliteTaskStore, Task, TaskManager
+
+# Benchmarks the load, punch, summary and graph paths of PyPunchCard against
+# seeded synthetic histories, and compares saved runs against each other.
+#
+#     PyPunchCardBench.py run --records 1000,100000 --tasks 1,100 --save before.json
+#     PyPunchCardBench.py compare before.json after.json
+
+SEED = 1234
+HISTORY_START = datetime(2015, 1, 1)
+PUNCHES = 1000
+STARTUP_TASK = "BenchStartup"
+
+
+def generateHistory(recordCount, taskCount, seed=SEED):
+    '''Builds a save file worth of records in TASK_MEMORY.json layout.
+    Records are handed out to task names with a skew towards the first few
+    names the way real histories are, and roughly one task in a hundred is
+    left punched in.
+    '''
+    rng = random.Random(seed)
+    names = ["Task{0}".format(i) for i in range(taskCount)]
+    weights = [1.0 / (i + 1) for i in range(taskCount)]
+    openNames = set(rng.sample(names, max(1, taskCount // 100)))
+    lastRecord = {}
+    records = []
+    t = HISTORY_START
+    for name in rng.choices(names, weights, k=recordCount):
+        t += timedelta(minutes=rng.randint(1, 240))
+        end = t + timedelta(minutes=rng.randint(5, 480))
+        lastRecord[name] = len(records)
+        records.append({"TaskName": name, "TaskStart": Task.date_time_to_date_time_string(t), "TaskEnd": Task.date_time_to_date_time_string(end)})
+    for name in openNames:
+        if name in lastRecord:
+            records[lastRecord[name]]["TaskEnd"] = None
+    return records
+
+
+def loadedManager(jsonText):
+    tm = TaskManager()
+    tm.fromJson(jsonText)
+    for name in tm.taskNames():
+        tm.get(name)
+    return tm
+
+
+def benchFromJson(ctx):
+    return lambda: loadedManager(ctx["Json"])
+
+
+def benchLoad(ctx):
+    def run():
+        tm = TaskManager()
+        tm.load(ctx["JsonPath"])
+        for name in tm.taskNames():
+            tm.get(name)
+    return run
+
+
+def benchLoadBinary(ctx):
+    def run():
+        tm = TaskManager()
+        tm.load(ctx["BinaryPath"])
+        for name in tm.taskNames():
+            tm.get(name)
+    return run
+
+
+def benchLoadSqlite(ctx):
+    def run():
+        tm = TaskManager()
+        tm.load(ctx["SqlitePath"])
+        for name in tm.taskNames():
+            tm.get(name)
+        tm.Store.close()
+    return run
+
+
+def benchToJson(ctx):
+    tm = loadedManager(ctx["Json"])
+    return lambda: tm.toJson()
+
+
+def benchPunch(ctx):
+    # Journaled the way the command line punches, each punch locks, appends to and fsyncs its task's journal
+    tm = loadedManager(ctx["Json"])
+    scratch = tempfile.mkdtemp(dir=ctx["Dir"])
+    savePath = os.path.join(scratch, "TASK_MEMORY.json") # Never written, so there's nothing to catch up with
+    journalDir = tm.JournalDir = os.path.join(scratch, "TASK_MEMORY.journals")
+    names = [name for name in tm.taskNames() if tm.getOpenTask(name) is None] or [STARTUP_TASK]
+    rng = random.Random(SEED)
+    t = datetime.now()
+
+    def run():
+        settings = PyPunchCardCore.SAVE_FILE, PyPunchCardCore.JOURNAL_DIR
+        PyPunchCardCore.SAVE_FILE, PyPunchCardCore.JOURNAL_DIR = savePath, journalDir
+        try:
+            for i in range(PUNCHES):
+                name = rng.choice(names)
+                tm.punchIn(name, t + timedelta(minutes=2 * i))
+                tm.punchOut(name, t + timedelta(minutes=2 * i + 1))
+        finally:
+            PyPunchCardCore.SAVE_FILE, PyPunchCardCore.JOURNAL_DIR = settings
+    return run
+
+
+def benchPunchSqlite(ctx):
+    # Every punch is its own committed transaction, the way the command line makes them
+    # A copy per run, so every run punches into the same history
+    sqlitePath = os.path.join(tempfile.mkdtemp(dir=ctx["Dir"]), os.path.basename(ctx["SqlitePath"]))
+    shutil.copyfile(ctx["SqlitePath"], sqlitePath)
+    tm = TaskManager()
+    tm.load(sqlitePath, None, True)
+    names = [name for name in tm.taskNames() if tm.Store.openRecord(name) is None] or [STARTUP_TASK]
+    rng = random.Random(SEED)
+    t = datetime.now()
+
+    def run():
+        for i in range(PUNCHES):
+            name = rng.choice(names)
+            tm.punchIn(name, t + timedelta(minutes=2 * i))
+            tm.punchOut(name, t + timedelta(minutes=2 * i + 1))
+    return run
+
+
+def benchSummary(ctx):
+    tm = loadedManager(ctx["Json"])
+    return lambda: [tm.getTaskSummary(name) for name in tm.taskNames()]
+
+
+def benchAveragePay(ctx):
+    tm = loadedManager(ctx["Json"])
+    return lambda: [tm.calculateAveragePay(tm.get(name), 20.0, 0.2) for name in tm.taskNames()]
+
+
+def benchTimeData(ctx):
+    import numpy # Imported up front so the import isn't timed as binning
+    tm = loadedManager(ctx["Json"])
+    tasks = list(tm.allTasks())
+    return lambda: PunchCardGrapher.convertTasksToTimeData(tasks)
+
+
+OPERATIONS = {
+    "fromJson": benchFromJson,
+    "load": benchLoad,
+    "loadBinary": benchLoadBinary,
+    "loadSqlite": benchLoadSqlite,
+    "toJson": benchToJson,
+    "punch": benchPunch,
+    "punchSqlite": benchPunchSqlite,
+    "summary": benchSummary,
+    "averagePay": benchAveragePay,
+    "timeData": benchTimeData,
+}
+
+
+def measure(setup, ctx, trackMemory):
+    run = setup(ctx)
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trackMemory:
+        # Traced separately, tracemalloc slows down whatever it watches
+        run = setup(ctx)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def measureStartup(ctx, repeat=5):
+    '''Milliseconds a "Punch in" takes on top of a bare interpreter start, on a
+    copy of the save file compacted the way it's kept between punches
+    '''
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PyPunchCard.py")
+    scratch = tempfile.mkdtemp(dir=ctx["Dir"])
+    shutil.copyfile(ctx["JsonPath"], os.path.join(scratch, "TASK_MEMORY.json"))
+
+    def elapsed(command):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=scratch, stdout=subprocess.DEVNULL, check=True)
+        return time.perf_counter() - start
+
+    elapsed([sys.executable, script, "Compact"]) # Writes the stats a punch reads
+    baseline = min(elapsed([sys.executable, "-c", "pass"]) for _ in range(repeat))
+    punches = []
+    for _ in range(repeat):
+        punches.append(elapsed([sys.executable, script, "Punch", "in", STARTUP_TASK]))
+        elapsed([sys.executable, script, "Punch", "out", STARTUP_TASK]) # So every timed punch in is let through
+    return (min(punches) - baseline) * 1000
+
+
+def runBenchmarks(args):
+    results = []
+    for recordCount in args.records:
+        for taskCount in args.tasks:
+            records = generateHistory(recordCount, taskCount, args.seed)
+            with tempfile.TemporaryDirectory() as tmpDir:
+                ctx = {"Dir": tmpDir, "Json": json.dumps(records), "JsonPath": os.path.join(tmpDir, "TASK_MEMORY.json"), "BinaryPath": os.path.join(tmpDir, "TASK_MEMORY.ppcb"), "SqlitePath": os.path.join(tmpDir, "TASK_MEMORY.sqlite")}
+                del records
+                with open(ctx["JsonPath"], 'w') as outF:
+                    outF.write(ctx["Json"])
+                BinaryTaskStore.fromJsonFile(ctx["JsonPath"], ctx["BinaryPath"])
+                SqliteTaskStore.fromJsonFile(ctx["JsonPath"], ctx["SqlitePath"])
+                for op in args.ops:
+                    if op == "startup":
+                        result = {"Op": op, "Records": recordCount, "Tasks": taskCount, "Milliseconds": measureStartup(ctx)}
+                        print("{Op:>12} {Records:>10} records {Tasks:>6} tasks {Milliseconds:>10.1f} ms over bare interpreter".format(**result))
+                    else:
+                        seconds, peak = measure(OPERATIONS[op], ctx, not args.no_memory)
+                        work = PUNCHES * 2 if op in ("punch", "punchSqlite") else recordCount
+                        result = {"Op": op, "Records": recordCount, "Tasks": taskCount, "Seconds": seconds, "PerSecond": work / seconds if seconds > 0 else None, "PeakBytes": peak}
+                        print("{Op:>12} {Records:>10} records {Tasks:>6} tasks {Seconds:>10.4f} s {PerSecond:>14,.0f} /s".format(**result) + ("" if peak is None else " {0:>10.1f} MB peak".format(peak / 2 ** 20)))
+                    results.append(result)
+    return results
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(oldPath, newPath):
+    with open(oldPath, 'r') as inF:
+        old = json.load(inF)
+    with open(newPath, 'r') as inF:
+        new = json.load(inF)
+    print("{0} ({1}) -> {2} ({3})\n".format(oldPath, old.get("Revision"), newPath, new.get("Revision")))
+    oldResults = {(r["Op"], r["Records"], r["Tasks"]): r for r in old["Results"]}
+    for r in new["Results"]:
+        key = (r["Op"], r["Records"], r["Tasks"])
+        if key not in oldResults:
+            continue
+        o = oldResults[key]
+        metric = "Milliseconds" if r["Op"] == "startup" else "Seconds"
+        line = "{0:>12} {1:>10} records {2:>6} tasks  time x{3:.2f}".format(r["Op"], r["Records"], r["Tasks"], r[metric] / o[metric] if o[metric] else float("inf"))
+        if r.get("PeakBytes") and o.get("PeakBytes"):
+            line += "  peak memory x{0:.2f}".format(r["PeakBytes"] / o["PeakBytes"])
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks PyPunchCard on seeded synthetic histories")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("--records", type=lambda v: [int(x) for x in v.split(",")], default=[1000, 10000, 100000], help="comma separated history sizes")
+    run.add_argument("--tasks", type=lambda v: [int(x) for x in v.split(",")], default=[1, 100], help="comma separated task name counts")
+    run.add_argument("--ops", type=lambda v: v.split(","), default=list(OPERATIONS) + ["startup"], help="comma separated operations: " + ",".join(list(OPERATIONS) + ["startup"]))
+    run.add_argument("--seed", type=int, default=SEED)
+    run.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    run.add_argument("--save", help="write the results to this JSON file")
+    run.add_argument("--startup-budget", type=float, help="fail when a punch takes longer than this many ms over a bare interpreter")
+    comp = commands.add_parser("compare", help="compare two saved runs")
+    comp.add_argument("old")
+    comp.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare(args.old, args.new)
+        return
+    unknown = [op for op in args.ops if op not in OPERATIONS and op != "startup"]
+    if unknown:
+        parser.error("unknown operations: " + ",".join(unknown))
+    results = runBenchmarks(args)
+    if args.save:
+        with open(args.save, 'w') as outF:
+            json.dump({"Revision": revision(), "Python": sys.version.split()[0], "Seed": args.seed, "Results": results}, outF, indent=2)
+    if args.startup_budget is not None:
+        over = [r for r in results if r["Op"] == "startup" and r["Milliseconds"] > args.startup_budget]
+        for r in over:
+            print("Startup budget of {0} ms exceeded: {1:.1f} ms with {2} records".format(args.startup_budget, r["Milliseconds"], r["Records"]))
+        if over:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
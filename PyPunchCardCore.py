@@ -0,0 +1,2962 @@
+#!/bin/python
+
+import base64
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+# Needs an option to check time of currently punched in task
+
+SAVE_FILE = "TASK_MEMORY.json"
+JOURNAL_DIR = "TASK_MEMORY.journals" # One journal per task, set to None to rewrite SAVE_FILE after every punch instead
+STORE_RETRIES = 5 # Attempts at a punch when JOURNAL_DIR is None and other processes keep changing SAVE_FILE
+SOCKET_FILE = "TASK_MEMORY.sock" # Where a running daemon listens for commands
+DAEMON_FLUSH_SECONDS = 1.0 # How long a daemon holds punches before they go to the journal
+CARD_CACHE_DIR = "TASK_MEMORY.cards" # Punch cards rendered by Export All, named by a hash of what they show
+CARD_CACHE_BYTES = 256 * 2 ** 20 # Least recently used cards are evicted once the cache grows past this
+CARD_MANIFEST = ".punchcards.json" # Which card each file Export All saved was, kept in the directory it saved to
+PROFILER = None # Profiler of the running command, set by --profile or PUNCHCARD_PROFILE
+HELP_DOC = "{0}\n\n    Punch (in|out|i|o) [TaskName] \n    (Optional)[Time]                 -    Punch in or out of a task, now or at a \n                                          time like 2009-05-13T19:19:30\n\n    List Tasks                       -    Lists currently created tasks\n\n    List Task [TaskName]             -    Lists punch clock records for the task\n\n    Print Summary                    -    Prints a summary of all tasks\n\n    Print Summary [TaskName]         -    Prints a summary of the task\n\n    Display Tasks                    -    Displays a punch card graph of all tasks\n\n    Display Task [TaskName]          -    Displays a punch card graph of the task\n\n    Export Tasks [path.png|svg]      -    Saves a punch card graph of all tasks\n\n    Export Task [TaskName] \n    [path.png|svg]                   -    Saves a punch card graph of the task\n\n    Export All [Directory] \n    (Optional)[png|svg]              -    Saves a punch card graph of every task, \n                                          redrawing only the ones that changed\n\n    Export Records (csv|ndjson) \n    (Optional)[File|-]               -    Streams the punch clock records to a file \n                                          or standard output\n\n        (Optional)--task [TaskName] \n        (Optional)--state (open|closed) \n        (Optional)--from [Date] \n        (Optional)--to [Date]        -    Only exports the records of a task, that \n                                          are running or not, or that started from \n                                          and through dates like 2009-05-13\n\n    Calc Avg Pay [TaskName] \n    [HourlyWage] \n    (Optional)[IncomeTax]            -    Displays a rough average net income for \n                                          a task\n\n    Calc Hours [TaskName]            -    Displays the hours worked on a task, \n                                          split at midnight\n\n    Calc Pay [TaskName] \n    [HourlyWage] \n    (Optional)[IncomeTax]            -    Displays the net income for the hours \n                                          worked on a task\n\n        (Optional)--from [Date] \n        (Optional)--to [Date]        -    Only counts the days from and through \n                                          dates like 2009-05-13\n\n        (Optional)--by (week|month)  -    Also totals each week or month \n                                          that had work\n\n    Compact                          -    Folds the punch journals into the save file\n\n    Convert [Source] [Destination]   -    Converts between the JSON save file, \n                                          the binary .ppcb format and .sqlite\n\n    Report Team [Directory] \n    (Optional)[path.png|svg]         -    Summarizes every save file in a directory \n                                          and their combined punch card\n\n    Daemon                           -    Keeps the tasks in memory and answers \n                                          Punch, List, Print and Calc over a socket\n\n    Daemon Stop                      -    Stops a running daemon\n\n    Batch [File|-]                   -    Runs a command per line of a file or \n                                          standard input, saving once at the end\n\n    --profile[=json,cprofile=PATH]   -    Times each phase of the command, \n                                          also set by PUNCHCARD_PROFILE\n"
+
+
+class Task:
+    _DateFormat = '%Y-%m-%dT%H:%M:%S'  # 2009-05-13T19:19:30
+    _Epoch = datetime(1970, 1, 1) # Times are naive local times, so epochs are counted from a naive epoch too
+    # Times are kept as whole epoch seconds, the resolution they're saved at, and handed out as datetimes
+    __slots__ = ("Name", "StartEpoch", "EndEpoch")
+
+    def __init__(self, name, starttime=None, endtime=None):
+        self.Name = name
+        if starttime is None:
+            starttime = datetime.now()
+        if type(starttime) is not datetime:
+            raise Exception("Argument Error: Start time is not a datetime object!")
+        self.StartEpoch = Task.date_time_to_epoch(starttime)
+        self.EndEpoch = None
+        if type(endtime) is datetime:
+            if endtime >= starttime: # Punching in and out within a second gives an empty task
+                self.EndEpoch = Task.date_time_to_epoch(endtime)
+            else:
+                raise Exception("Argument Error: End time cannot be less than start time!")
+
+    @staticmethod
+    def from_epochs(name, start, end=None):
+        # For records that were checked when they were made
+        task = Task.__new__(Task)
+        task.Name = name
+        task.StartEpoch = start
+        task.EndEpoch = end
+        return task
+
+    def __str__(self):
+        ret = "Name={0}\nStarted={1}".format(self.get_name(), Task.date_time_to_date_time_string(self.get_start_time()))
+        e = self.get_end_time()
+        if e is not None:
+            ret += "\nEnded={0}".format(Task.date_time_to_date_time_string(e))
+        return ret
+
+    @staticmethod
+    def seconds_to_hours(seconds):
+        return seconds / 60 / 60
+
+    @staticmethod
+    def date_time_string_to_date_time(dtstring):
+        # _DateFormat is fixed width ISO 8601 which fromisoformat parses in C, strptime is kept
+        # for anything that's been hand edited into a looser shape
+        if len(dtstring) == 19 and dtstring[10] == 'T':
+            try:
+                return datetime.fromisoformat(dtstring)
+            except ValueError:
+                pass
+        return datetime.strptime(dtstring, Task._DateFormat)
+
+    @staticmethod
+    def date_time_to_date_time_string(dt):
+        if dt.tzinfo is None and dt.year >= 1000:
+            return dt.isoformat(timespec='seconds')
+        return dt.strftime(Task._DateFormat)
+
+    @staticmethod
+    def date_time_to_epoch(dt):
+        # Same as (dt - Task._Epoch) // timedelta(seconds=1), without building the timedelta
+        return (dt.toordinal() - 719163) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+    @staticmethod
+    def epoch_to_date_time(seconds):
+        return Task._Epoch + timedelta(seconds=seconds)
+
+    def to_dict(self):
+        export = dict()
+        export["TaskName"] = self.get_name()
+        export["TaskStart"] = Task.date_time_to_date_time_string(self.get_start_time())
+        t_end = self.get_end_time()
+        if t_end is not None:
+            t_end = Task.date_time_to_date_time_string(t_end)
+        export["TaskEnd"] = t_end
+        return export
+
+    # TODO Possible exception when self.EndEpoch is None
+    def get_duration_in_seconds(self, to_time=None):
+        if to_time is None or type(to_time) is not datetime:
+            return self.EndEpoch - self.StartEpoch
+        return Task.date_time_to_epoch(to_time) - self.StartEpoch
+
+    # TODO Possible exception when self.EndEpoch is None
+    def get_duration_in_hours(self, to_time=None):
+        hours = Task.seconds_to_hours(self.get_duration_in_seconds(to_time))
+        return hours
+
+    def get_start_time(self):
+        return Task.epoch_to_date_time(self.StartEpoch)
+
+    def set_end_time(self, new_val):
+        self.EndEpoch = None if new_val is None else Task.date_time_to_epoch(new_val)
+
+    def get_end_time(self):
+        return None if self.EndEpoch is None else Task.epoch_to_date_time(self.EndEpoch)
+
+    def get_name(self):
+        return self.Name
+
+
+class TaskHistory:
+    '''Every record of one task as parallel array('q') columns of start and
+    end epochs, sorted by start. Reads like a list of Task, which are built
+    for an index only when it's asked for and are copies: changes go through
+    add and set_end. Sixteen bytes a record instead of a Task object with two
+    datetimes.
+    '''
+    NO_END = -2 ** 63 # End of a running record
+
+    def __init__(self, name):
+        self.Name = name
+        self.Starts = array('q')
+        self.Ends = array('q')
+
+    def __len__(self):
+        return len(self.Starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.Starts)))]
+        end = self.Ends[index]
+        return Task.from_epochs(self.Name, self.Starts[index], None if end == TaskHistory.NO_END else end)
+
+    def __iter__(self):
+        for start, end in self.epochs():
+            yield Task.from_epochs(self.Name, start, end)
+
+    def __repr__(self):
+        return "TaskHistory({0!r}, {1} records)".format(self.Name, len(self.Starts))
+
+    def epochs(self):
+        '''Yields (start epoch, end epoch or None) of every record'''
+        noEnd = TaskHistory.NO_END
+        for start, end in zip(self.Starts, self.Ends):
+            yield start, None if end == noEnd else end
+
+    def index_of_start(self, start, after=False):
+        # Binary search of the start column, after places equal start times before the index
+        return bisect_right(self.Starts, start) if after else bisect_left(self.Starts, start)
+
+    def add(self, start, end=None):
+        '''Adds a record by its epochs, returns the index it ended up at'''
+        if len(self.Starts) == 0 or self.Starts[-1] <= start:
+            i = len(self.Starts) # The usual case, new records come in order
+            self.Starts.append(start)
+            self.Ends.append(TaskHistory.NO_END if end is None else end)
+        else:
+            i = self.index_of_start(start, True)
+            self.Starts.insert(i, start)
+            self.Ends.insert(i, TaskHistory.NO_END if end is None else end)
+        return i
+
+    def index_of_running(self, start):
+        # Index of the running record that started at start, None when there isn't one
+        for i in range(self.index_of_start(start), self.index_of_start(start, True)):
+            if self.Ends[i] == TaskHistory.NO_END:
+                return i
+        return None
+
+    def set_end(self, index, end):
+        self.Ends[index] = TaskHistory.NO_END if end is None else end
+
+
+class TaskStats:
+    '''Running aggregates of one task's records, updated a punch at a time.
+    Duration mean and variance use Welford's method. Start and end times are
+    averaged as times of day on a 24 hour circle, so 23:00 and 01:00 average
+    to midnight instead of noon. Worked seconds are rolled up per day, split
+    at midnight, as running totals so any range of days is two lookups.
+    '''
+    SECONDS_IN_DAY = 24 * 60 * 60
+
+    def __init__(self):
+        self.Count = 0 # Finished records
+        self.Total = 0.0 # Seconds
+        self.Mean = 0.0
+        self.M2 = 0.0
+        self.StartSin = 0.0
+        self.StartCos = 0.0
+        self.EndSin = 0.0
+        self.EndCos = 0.0
+        self.Open = [] # Start epochs of running records, oldest first
+        self.Days = [] # Day numbers (epoch // SECONDS_IN_DAY) of days with finished work, in order, and
+        self.Through = [] # the seconds worked from the first of them through the end of each
+
+    @staticmethod
+    def time_of_day_angle(epoch):
+        return 2 * math.pi * (epoch % TaskStats.SECONDS_IN_DAY) / TaskStats.SECONDS_IN_DAY
+
+    @staticmethod
+    def day_of(epoch):
+        # Epochs count from a naive epoch, so every day is exactly SECONDS_IN_DAY long
+        return epoch - epoch % TaskStats.SECONDS_IN_DAY
+
+    @staticmethod
+    def split_days(start, end):
+        '''Yields (midnight epoch, seconds) for each day start to end covers'''
+        while start < end:
+            day = TaskStats.day_of(start)
+            nextDay = day + TaskStats.SECONDS_IN_DAY
+            yield day, min(end, nextDay) - start
+            start = nextDay
+
+    @staticmethod
+    def clipped_seconds(start, end, since=None, until=None):
+        if since is not None:
+            start = max(start, since)
+        if until is not None:
+            end = min(end, until)
+        return max(0, end - start)
+
+    @staticmethod
+    def angle_to_time_of_day(sinSum, cosSum):
+        if abs(sinSum) < 1e-9 and abs(cosSum) < 1e-9:
+            return None # Evenly spread around the clock, there's no meaningful average
+        angle = math.atan2(sinSum, cosSum) % (2 * math.pi)
+        return int(round(angle / (2 * math.pi) * TaskStats.SECONDS_IN_DAY)) % TaskStats.SECONDS_IN_DAY
+
+    # Times going in are epochs
+    def punch_in(self, start):
+        self.Open.insert(bisect_right(self.Open, start), start)
+
+    def punch_out(self, start, end):
+        if start in self.Open:
+            self.Open.remove(start)
+        self.add_finished(start, end)
+
+    def add_finished(self, start, end):
+        duration = end - start
+        self.Count += 1
+        self.Total += duration
+        delta = duration - self.Mean
+        self.Mean += delta / self.Count
+        self.M2 += delta * (duration - self.Mean)
+        angle = TaskStats.time_of_day_angle(start)
+        self.StartSin += math.sin(angle)
+        self.StartCos += math.cos(angle)
+        angle = TaskStats.time_of_day_angle(end)
+        self.EndSin += math.sin(angle)
+        self.EndCos += math.cos(angle)
+        self.add_worked(start, end)
+
+    def add_worked(self, start, end):
+        day = start // TaskStats.SECONDS_IN_DAY
+        if end <= (day + 1) * TaskStats.SECONDS_IN_DAY and (not self.Days or day >= self.Days[-1]):
+            # The usual case, a record within a day that's the latest so far
+            if self.Days and day == self.Days[-1]:
+                self.Through[-1] += end - start
+            else:
+                self.Days.append(day)
+                self.Through.append((self.Through[-1] if self.Through else 0) + end - start)
+            return
+        for midnight, seconds in TaskStats.split_days(start, end):
+            day = midnight // TaskStats.SECONDS_IN_DAY
+            i = bisect_left(self.Days, day)
+            if i == len(self.Days) or self.Days[i] != day:
+                self.Days.insert(i, day)
+                self.Through.insert(i, self.Through[i - 1] if i > 0 else 0)
+            for j in range(i, len(self.Through)): # Just the one, unless an older record is filled in
+                self.Through[j] += seconds
+
+    def worked_through(self, until=None):
+        '''Seconds of finished work on the days starting before the until epoch'''
+        i = len(self.Days) if until is None else bisect_left(self.Days, -(-until // TaskStats.SECONDS_IN_DAY))
+        return self.Through[i - 1] if i > 0 else 0
+
+    def worked_seconds(self, since=None, until=None, now=None):
+        '''Seconds worked on the days in [since, until), midnight epochs or None
+        for open ended. Running records count up to now, or not at all when now
+        is None.
+        '''
+        seconds = self.worked_through(until) - (0 if since is None else self.worked_through(since))
+        if now is not None:
+            seconds += sum(TaskStats.clipped_seconds(start, now, since, until) for start in self.Open)
+        return seconds
+
+    def first_day(self):
+        # Midnight epoch of the first day anything was worked, None when nothing was
+        days = [day * TaskStats.SECONDS_IN_DAY for day in self.Days[:1]] + [TaskStats.day_of(start) for start in self.Open[:1]]
+        return min(days) if days else None
+
+    def get_variance(self):
+        return self.M2 / (self.Count - 1) if self.Count > 1 else 0.0
+
+    def get_std_dev(self):
+        return math.sqrt(self.get_variance())
+
+    def get_mean_start_time(self):
+        return TaskStats.angle_to_time_of_day(self.StartSin, self.StartCos)
+
+    def get_mean_end_time(self):
+        return TaskStats.angle_to_time_of_day(self.EndSin, self.EndCos)
+
+    @staticmethod
+    def pack_ints(values):
+        return base64.b64encode(array('i', values).tobytes()).decode("ascii")
+
+    @staticmethod
+    def unpack_ints(text):
+        return array('i', base64.b64decode(text))
+
+    def to_dict(self):
+        # Rollups are packed as day numbers and the seconds worked on each, as JSON lists they'd be most of loading the stats
+        data = dict(self.__dict__)
+        data["Days"] = TaskStats.pack_ints(self.Days)
+        data["Through"] = TaskStats.pack_ints([b - a for a, b in zip([0] + self.Through, self.Through)])
+        return data
+
+    @staticmethod
+    def from_dict(data):
+        stats = TaskStats()
+        for key in stats.__dict__.keys():
+            setattr(stats, key, data[key])
+        stats.Days = TaskStats.unpack_ints(data["Days"]).tolist()
+        stats.Through = list(accumulate(TaskStats.unpack_ints(data["Through"])))
+        return stats
+
+    @staticmethod
+    def from_epochs(records):
+        # records are (start epoch, end epoch or None) pairs
+        stats = TaskStats()
+        for start, end in records:
+            if end is None:
+                stats.punch_in(start)
+            else:
+                stats.add_finished(start, end)
+        return stats
+
+
+class TaskStore:
+    '''A save file TaskManager queries in place instead of loading it whole.
+    Subclasses provide names, records, write and close. The queries below are
+    built on records, a store that can answer them faster overrides them.
+    Times going in and out are epochs. Stores are opened with the path and
+    whether the command will write to them.
+    '''
+    EXTENSION = None
+    Writable = False # Whether punches go straight into the store
+    Queryable = True # Whether the queries below are cheaper than decoding the task's records once
+    Errors = () # Parts of the file that aren't records, found as it's read
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def names(self):
+        raise NotImplementedError()
+
+    def hasTask(self, taskName):
+        return taskName in self.names()
+
+    def records(self, taskName=None, since=None, until=None, errorList=None):
+        '''Yields (TaskName, start epoch, end epoch) tuples.
+        since and until are epochs bounding the start time, until is exclusive.
+        Records that can't be decoded go into errorList.
+        '''
+        raise NotImplementedError()
+
+    def tasks(self, taskName=None, since=None, until=None):
+        for name, start, end in self.records(taskName, since, until):
+            yield Task.from_epochs(name, start, end)
+
+    def taskRecords(self):
+        taskRecords = {}
+        errorList = []
+        for name, start, end in self.records(errorList=errorList):
+            taskRecords.setdefault(name, []).append((start, end))
+        errorList = list(self.Errors) + errorList
+        if len(errorList) > 0:
+            raise errorList[0] # A conversion that drops records isn't one
+        return taskRecords
+
+    def workedSeconds(self, taskName, since=None, until=None, now=None):
+        '''Seconds worked on a task in [since, until), records that cross either
+        end only count the part inside. Running records count up to now or not
+        at all when now is None.
+        '''
+        seconds = 0
+        for _, start, end in self.records(taskName, None, until):
+            if end is None:
+                end = now
+            if end is not None:
+                seconds += TaskStats.clipped_seconds(start, end, since, until)
+        return seconds
+
+    def firstStart(self, taskName):
+        return min((start for _, start, _ in self.records(taskName)), default=None)
+
+    def stats(self, taskName):
+        # TaskStats of a task without going through its records, None when the store has to be read for them
+        return None
+
+    def compact(self):
+        pass
+
+    def generation(self):
+        # How many times the journals were folded into the file, only punches journaled since are replayed on top of it
+        return 0
+
+    def transaction(self):
+        from contextlib import nullcontext
+        return nullcontext() # Nothing to commit, punches go to the journals
+
+    def punchIn(self, taskName, start):
+        raise Exception("IO Error: {0} files are read only!".format(self.EXTENSION))
+
+    def punchOut(self, taskName, end):
+        raise Exception("IO Error: {0} files are read only!".format(self.EXTENSION))
+
+    @staticmethod
+    def write(path, taskRecords, generation=0):
+        '''Writes { TaskName: [ (start epoch, end epoch or None), ... ] } to path,
+        along with the generation of journals it holds, where the format has room.
+        '''
+        raise NotImplementedError()
+
+    @staticmethod
+    def classFor(path):
+        # Extension first, closing any descriptor of an open SQLite database drops the locks its connections hold
+        for storeClass in (BinaryTaskStore, SqliteTaskStore):
+            if path.endswith(storeClass.EXTENSION):
+                return storeClass
+        for storeClass in (BinaryTaskStore, SqliteTaskStore):
+            if storeClass.isStore(path):
+                return storeClass
+        return JsonTaskStore # Anything else is taken for a JSON save file
+
+    @staticmethod
+    def isStore(path):
+        return False
+
+    @classmethod
+    def fromJsonFile(cls, jsonPath, storePath):
+        with JsonTaskStore(jsonPath) as store:
+            cls.write(storePath, store.taskRecords(), store.generation())
+
+
+class JsonTaskStore(TaskStore):
+    '''The JSON save file, read only as far as a command needs it. A single task
+    is searched for without parsing the rest of the file, listing the tasks
+    parses it once and keeps every task's rows with their timestamps still
+    undecoded, and reading every record before either streams the file.
+    Punches go to the journals, the file is only ever rewritten whole. A path
+    of None or of a file that doesn't exist yet holds no tasks. Once the
+    journals have been folded in, the first element of the root list is
+    {"JournalGeneration": N} rather than a record.
+    '''
+    EXTENSION = ".json"
+    Queryable = False # Every query would decode the task's records again, they're decoded once and kept instead
+
+    def __init__(self, path, writable=False, elements=None):
+        self.Path = path
+        self.Errors = []
+        self.Rows = None # { TaskName: [ (TaskStart, TaskEnd) ] } of the whole file once it's parsed
+        self.Found = {} # { TaskName: [ (TaskStart, TaskEnd) ] } of tasks searched for one at a time
+        self.Generation = None # Read on first use
+        if elements is not None:
+            self.Rows = JsonTaskStore.groupRows(elements, self.Errors)
+        elif path is None or not os.path.exists(path):
+            self.Rows = {}
+
+    @staticmethod
+    def groupRows(elements, errorList):
+        # { TaskName: [ (TaskStart, TaskEnd) ] } out of the elements under the root list
+        rows = {}
+        for i in elements:
+            if type(i) is not dict:
+                errorList.append(Exception("Format Exception: Element under root list wasn't a dictionary!"))
+                continue
+            if "JournalGeneration" in i:
+                continue
+            try:
+                rows.setdefault(i["TaskName"], []).append((i["TaskStart"], i.get("TaskEnd")))
+            except Exception as e:
+                errorList.append(e)
+        if PROFILER is not None:
+            Profiler.count("records parsed", sum(len(taskRows) for taskRows in rows.values()))
+        return rows
+
+    def allRows(self):
+        if self.Rows is None:
+            if PROFILER is not None:
+                Profiler.count("bytes read", os.path.getsize(self.Path))
+            self.Rows = Profiler.timed("parse", JsonTaskStore.groupRows, TaskManager.iterJsonRecords(self.Path), self.Errors)
+        return self.Rows
+
+    def taskRows(self, taskName):
+        if self.Rows is None and taskName not in self.Found:
+            elements = Profiler.timed("find", TaskManager.findJsonRecords, self.Path, taskName)
+            if elements is None:
+                return self.allRows().get(taskName, [])
+            self.Found[taskName] = JsonTaskStore.groupRows(elements, self.Errors).get(taskName, [])
+        return self.Found[taskName] if self.Rows is None else self.Rows.get(taskName, [])
+
+    def names(self):
+        return list(self.allRows().keys())
+
+    def hasTask(self, taskName):
+        return len(self.taskRows(taskName)) > 0
+
+    def generation(self):
+        if self.Generation is None:
+            self.Generation = 0
+            if self.Path is not None and os.path.exists(self.Path):
+                # Only the first element is read
+                first = next(TaskManager.iterJsonRecords(self.Path, 4096), None)
+                if type(first) is dict and "JournalGeneration" in first:
+                    self.Generation = first["JournalGeneration"]
+        return self.Generation
+
+    def records(self, taskName=None, since=None, until=None, errorList=None):
+        if errorList is None:
+            errorList = []
+        if taskName is None and self.Rows is None:
+            # Nothing is kept, records go out as the file is read
+            yield from TaskManager.iterJsonEpochs(TaskManager.iterJsonRecords(self.Path), errorList, None, since, until)
+            return
+        for name in list(self.Rows) if taskName is None else [taskName]:
+            for start, end in TaskManager.decodeTaskRows(name, self.taskRows(name), errorList):
+                if (since is None or start >= since) and (until is None or start < until):
+                    yield name, start, end
+
+    @staticmethod
+    def write(path, taskRecords, generation=0):
+        # Written next to the target and swapped in so a crash never leaves a half written save file
+        root = [{"JournalGeneration": generation}] if generation > 0 else []
+        root += [Task.from_epochs(name, start, end).to_dict() for name, rows in taskRecords.items() for start, end in rows]
+        tmpPath = path + ".tmp"
+        with open(tmpPath, 'w') as outF:
+            json.dump(root, outF)
+            outF.flush()
+            os.fsync(outF.fileno())
+        os.replace(tmpPath, path)
+
+
+class BinaryTaskStore(TaskStore):
+    '''Read only view of a binary task history file.
+    Records are fixed width and read straight out of a memory map, so opening
+    a file costs the same no matter how much history it holds and a query only
+    touches the pages of the task it asks for.
+    Layout
+    ======
+    - Header: magic, version, record count, name table offset, journal
+            generation (version 2 on, version 1 files are generation 0)
+    - Records: (start epoch, end epoch, name id) grouped by task and sorted
+            by start time within each task
+    - Name table: (first record, record count, name length, name) per task
+    '''
+    MAGIC = b"PPCB"
+    VERSION = 2
+    EXTENSION = ".ppcb"
+    HEADER = struct.Struct("<4sHxxQQQ")
+    HEADER_V1 = struct.Struct("<4sHxxQQ")
+    RECORD = struct.Struct("<qqI4x")
+    NAME_ENTRY = struct.Struct("<QQH")
+    OPEN_END = -(2 ** 63) # End epoch of a task that hasn't been punched out of
+
+    def __init__(self, path, writable=False):
+        self.Names = {} # { TaskName: (id, first record, record count) }
+        self.NameList = []
+        with open(path, 'rb') as inF:
+            self.Map = mmap.mmap(inF.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.Count, nameTableOffset = self.HEADER_V1.unpack_from(self.Map, 0)
+        if magic != self.MAGIC or version not in (1, self.VERSION):
+            self.close()
+            raise Exception("Format Exception: '{0}' isn't a binary task store!".format(path))
+        self.Generation = 0
+        self.RecordsOffset = self.HEADER_V1.size
+        if version > 1:
+            self.Generation = self.HEADER.unpack_from(self.Map, 0)[4]
+            self.RecordsOffset = self.HEADER.size
+        offset = nameTableOffset
+        while offset < len(self.Map):
+            first, count, length = self.NAME_ENTRY.unpack_from(self.Map, offset)
+            offset += self.NAME_ENTRY.size
+            name = self.Map[offset:offset + length].decode("utf-8")
+            offset += length
+            self.Names[name] = (len(self.NameList), first, count)
+            self.NameList.append(name)
+
+    def __len__(self):
+        return self.Count
+
+    def close(self):
+        self.Map.close()
+
+    def names(self):
+        return list(self.NameList)
+
+    def generation(self):
+        return self.Generation
+
+    def records(self, taskName=None, since=None, until=None, errorList=None):
+        if taskName is None:
+            for name in self.NameList:
+                yield from self.records(name, since, until)
+            return
+        if taskName not in self.Names:
+            return
+        nameId, first, count = self.Names[taskName]
+        size = self.RECORD.size
+        view = memoryview(self.Map)[self.RecordsOffset + first * size:self.RecordsOffset + (first + count) * size]
+        try:
+            startAt = lambda i: self.RECORD.unpack_from(view, i * size)[0]
+            lo = 0 if since is None else bisect_left(range(count), since, key=startAt)
+            hi = count if until is None else bisect_left(range(count), until, key=startAt)
+            for start, end, _ in self.RECORD.iter_unpack(view[lo * size:hi * size]):
+                yield (taskName, start, None if end == self.OPEN_END else end)
+        finally:
+            view.release()
+
+    @staticmethod
+    def isStore(path):
+        try:
+            with open(path, 'rb') as inF:
+                return inF.read(len(BinaryTaskStore.MAGIC)) == BinaryTaskStore.MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def write(path, taskRecords, generation=0):
+        records = bytearray()
+        names = bytearray()
+        count = 0
+        for nameId, (name, rows) in enumerate(taskRecords.items()):
+            rows = sorted(rows, key=lambda row: row[0])
+            encoded = name.encode("utf-8")
+            names += BinaryTaskStore.NAME_ENTRY.pack(count, len(rows), len(encoded)) + encoded
+            for start, end in rows:
+                records += BinaryTaskStore.RECORD.pack(start, BinaryTaskStore.OPEN_END if end is None else end, nameId)
+            count += len(rows)
+        tmpPath = path + ".tmp"
+        with open(tmpPath, 'wb') as outF:
+            outF.write(BinaryTaskStore.HEADER.pack(BinaryTaskStore.MAGIC, BinaryTaskStore.VERSION, count, BinaryTaskStore.HEADER.size + len(records), generation))
+            outF.write(records)
+            outF.write(names)
+            outF.flush()
+            os.fsync(outF.fileno())
+        os.replace(tmpPath, path)
+
+
+class SqliteTaskStore(TaskStore):
+    '''Task history in a SQLite database that punches are written straight into.
+    Records are indexed on (task, start) and running records have a partial
+    index of their own, so a punch only touches the rows it needs however long
+    the history gets. Hours worked are rolled up per task and day as running
+    totals, kept up to date by every punch out, so the hours of any range of
+    days are two lookups, and so are the averages of a task's summary. The
+    database is in write-ahead logging mode so readers carry on while another
+    process has a punch or a batch going. Commands that only read open it read
+    only and never change the file, even one made before the rollups.
+    '''
+    MAGIC = b"SQLite format 3\x00"
+    EXTENSION = ".sqlite"
+    Writable = True
+    BUSY_TIMEOUT = 10.0 # Seconds to wait on another process's punch before giving up
+    SCHEMA_VERSION = 1 # PRAGMA user_version once every table below is made and filled in
+    SUMMARY_FIELDS = (("count", "Count"), ("total", "Total"), ("mean", "Mean"), ("m2", "M2"), ("start_sin", "StartSin"),
+                      ("start_cos", "StartCos"), ("end_sin", "EndSin"), ("end_cos", "EndCos")) # summaries columns and the TaskStats fields they hold
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS records (task TEXT NOT NULL, start_time INTEGER NOT NULL, end_time INTEGER)",
+        "CREATE INDEX IF NOT EXISTS records_task_start ON records (task, start_time)",
+        "CREATE INDEX IF NOT EXISTS records_open ON records (task, start_time) WHERE end_time IS NULL",
+        # Seconds worked on the task from its first day through the end of day, see TaskStats.Through
+        "CREATE TABLE IF NOT EXISTS days (task TEXT NOT NULL, day INTEGER NOT NULL, through INTEGER NOT NULL, PRIMARY KEY (task, day)) WITHOUT ROWID",
+        # Running aggregates of the finished records of each task, see TaskStats
+        "CREATE TABLE IF NOT EXISTS summaries (task TEXT NOT NULL PRIMARY KEY, count INTEGER NOT NULL, total REAL NOT NULL, mean REAL NOT NULL, m2 REAL NOT NULL, "
+        "start_sin REAL NOT NULL, start_cos REAL NOT NULL, end_sin REAL NOT NULL, end_cos REAL NOT NULL) WITHOUT ROWID",
+    )
+
+    def __init__(self, path, writable=False):
+        import sqlite3
+        if writable or not os.path.exists(path):
+            # Transactions are opened by hand, punches take the write lock up front with BEGIN IMMEDIATE.
+            # A database that doesn't exist is only made for a command that writes, reading one is reading an empty one
+            self.Connection = sqlite3.connect(path if writable else ":memory:", timeout=self.BUSY_TIMEOUT, isolation_level=None)
+        else:
+            self.Connection = sqlite3.connect(SqliteTaskStore.readOnlyUri(path), uri=True, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+        # Only read, opening a database that's up to date never waits on another process's punch
+        self.Rollups = self.Connection.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION
+        if not self.Rollups and (writable or not os.path.exists(path)):
+            self.migrate()
+            self.Rollups = True
+        if not writable:
+            return
+        if self.Connection.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+            try:
+                self.Connection.execute("PRAGMA journal_mode=WAL") # Stays set in the file once it's taken
+            except sqlite3.OperationalError:
+                pass # Another process has it open, one of the next to open it switches it over
+
+    @staticmethod
+    def readOnlyUri(path):
+        from urllib.parse import quote
+        return "file:{0}?mode=ro".format(quote(os.path.abspath(path).replace(os.sep, "/")))
+
+    def migrate(self):
+        # Once per database, new or made before the tables it's missing
+        with self.transaction():
+            if self.Connection.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION:
+                return # Another process got there first
+            for statement in self.SCHEMA:
+                self.Connection.execute(statement)
+            self.rebuildRollups()
+            self.Connection.execute("PRAGMA user_version = {0}".format(self.SCHEMA_VERSION))
+
+    def close(self):
+        self.Connection.close()
+
+    def names(self):
+        return [row[0] for row in self.Connection.execute("SELECT DISTINCT task FROM records ORDER BY task")]
+
+    def hasTask(self, taskName):
+        return self.Connection.execute("SELECT 1 FROM records WHERE task = ? LIMIT 1", (taskName,)).fetchone() is not None
+
+    def generation(self):
+        import sqlite3
+        try:
+            row = self.Connection.execute("SELECT generation FROM journal_generation").fetchone()
+        except sqlite3.OperationalError:
+            return 0 # Never written by write
+        return 0 if row is None else row[0]
+
+    def compact(self):
+        # Folds the write-ahead log back into the database file
+        self.Connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @staticmethod
+    def rangeQuery(columns, taskName=None, since=None, until=None):
+        where = []
+        params = []
+        for clause, value in (("task = ?", taskName), ("start_time >= ?", since), ("start_time < ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        return "SELECT {0} FROM records{1}".format(columns, " WHERE " + " AND ".join(where) if where else ""), params
+
+    def records(self, taskName=None, since=None, until=None, errorList=None):
+        query, params = SqliteTaskStore.rangeQuery("task, start_time, end_time", taskName, since, until)
+        yield from self.Connection.execute(query + " ORDER BY task, start_time", params)
+
+    def workedThrough(self, taskName, until=None):
+        if until is None:
+            row = self.Connection.execute("SELECT through FROM days WHERE task = ? ORDER BY day DESC LIMIT 1", (taskName,)).fetchone()
+        else:
+            row = self.Connection.execute("SELECT through FROM days WHERE task = ? AND day < ? ORDER BY day DESC LIMIT 1", (taskName, until)).fetchone()
+        return 0 if row is None else row[0]
+
+    def workedSeconds(self, taskName, since=None, until=None, now=None):
+        # since and until are midnights, finished work comes out of the day rollups
+        if not self.Rollups:
+            return TaskStore.workedSeconds(self, taskName, since, until, now)
+        seconds = self.workedThrough(taskName, until) - (0 if since is None else self.workedThrough(taskName, since))
+        if now is not None:
+            for (start,) in self.Connection.execute("SELECT start_time FROM records WHERE task = ? AND end_time IS NULL", (taskName,)):
+                seconds += TaskStats.clipped_seconds(start, now, since, until)
+        return seconds
+
+    def firstStart(self, taskName):
+        return self.Connection.execute("SELECT MIN(start_time) FROM records WHERE task = ?", (taskName,)).fetchone()[0]
+
+    def stats(self, taskName):
+        # Out of the summaries, the running records and the day rollups, read as one snapshot
+        if not self.Rollups:
+            return None # Made before the rollups and opened read only, the records are read instead
+        snapshot = not self.Connection.in_transaction
+        if snapshot:
+            self.Connection.execute("BEGIN")
+        try:
+            stats = self.summary(taskName)
+            stats.Open = [start for (start,) in self.Connection.execute("SELECT start_time FROM records WHERE task = ? AND end_time IS NULL ORDER BY start_time", (taskName,))]
+            for day, through in self.Connection.execute("SELECT day, through FROM days WHERE task = ? ORDER BY day", (taskName,)):
+                stats.Days.append(day // TaskStats.SECONDS_IN_DAY)
+                stats.Through.append(through)
+        finally:
+            if snapshot:
+                self.Connection.execute("COMMIT")
+        return stats
+
+    def summary(self, taskName):
+        # TaskStats holding only the aggregates of the task's finished records
+        stats = TaskStats()
+        row = self.Connection.execute("SELECT {0} FROM summaries WHERE task = ?".format(", ".join(column for column, _ in self.SUMMARY_FIELDS)), (taskName,)).fetchone()
+        for (_, field), value in zip(self.SUMMARY_FIELDS, row or ()):
+            setattr(stats, field, value)
+        return stats
+
+    def addFinished(self, taskName, start, end):
+        stats = self.summary(taskName)
+        stats.add_finished(start, end)
+        self.writeSummaries([(taskName, stats)])
+        self.addWorked(taskName, start, end)
+
+    def writeSummaries(self, taskStats):
+        self.Connection.executemany("INSERT OR REPLACE INTO summaries (task, {0}) VALUES (?{1})".format(", ".join(column for column, _ in self.SUMMARY_FIELDS), ", ?" * len(self.SUMMARY_FIELDS)),
+                                    ([taskName] + [getattr(stats, field) for _, field in self.SUMMARY_FIELDS] for taskName, stats in taskStats))
+
+    def addWorked(self, taskName, start, end):
+        for day, seconds in TaskStats.split_days(start, end):
+            self.Connection.execute("INSERT INTO days (task, day, through) VALUES (?1, ?2, ?3 + COALESCE((SELECT through FROM days WHERE task = ?1 AND day < ?2 ORDER BY day DESC LIMIT 1), 0)) "
+                                    "ON CONFLICT (task, day) DO UPDATE SET through = through + ?3", (taskName, day, seconds))
+            self.Connection.execute("UPDATE days SET through = through + ? WHERE task = ? AND day > ?", (seconds, taskName, day)) # Only when an older record is filled in
+
+    def rebuildRollups(self):
+        stats = {}
+        for taskName, start, end in self.Connection.execute("SELECT task, start_time, end_time FROM records WHERE end_time IS NOT NULL ORDER BY task, start_time"):
+            stats.setdefault(taskName, TaskStats()).add_finished(start, end)
+        self.Connection.execute("DELETE FROM days")
+        self.Connection.execute("DELETE FROM summaries")
+        self.writeSummaries(stats.items())
+        self.Connection.executemany("INSERT INTO days (task, day, through) VALUES (?, ?, ?)",
+                                    ((taskName, day * TaskStats.SECONDS_IN_DAY, through) for taskName, taskStats in stats.items() for day, through in zip(taskStats.Days, taskStats.Through)))
+
+    def openRecord(self, taskName):
+        # (rowid, start epoch) of the oldest running record, straight out of the partial index
+        return self.Connection.execute("SELECT rowid, start_time FROM records WHERE task = ? AND end_time IS NULL ORDER BY start_time LIMIT 1", (taskName,)).fetchone()
+
+    def punchIn(self, taskName, start):
+        with self.transaction():
+            if self.openRecord(taskName) is not None:
+                raise Exception("Argument Exception: The task '{0}' must be punched out of before you can punch in!".format(taskName))
+            self.Connection.execute("INSERT INTO records (task, start_time, end_time) VALUES (?, ?, NULL)", (taskName, start))
+
+    def punchOut(self, taskName, end):
+        '''Returns the start epoch of the record that was punched out of'''
+        with self.transaction():
+            row = self.openRecord(taskName)
+            if row is None:
+                if not self.hasTask(taskName):
+                    raise Exception("Argument Exception: The task '{0}' must exist to be punched out of!".format(taskName))
+                raise Exception("Argument Exception: The task '{0}' must be punched in before you can punch out!".format(taskName))
+            rowId, start = row
+            if end < start:
+                raise Exception("Argument Error: End time cannot be less than start time!")
+            self.Connection.execute("UPDATE records SET end_time = ? WHERE rowid = ?", (end, rowId))
+            self.addFinished(taskName, start, end)
+        return start
+
+    def transaction(self):
+        # Takes the write lock straight away, the connection commits when the block ends or rolls back if it raises
+        if self.Connection.in_transaction:
+            from contextlib import nullcontext
+            return nullcontext() # Part of a batch, it commits along with the rest
+        self.Connection.execute("BEGIN IMMEDIATE")
+        return self.Connection
+
+    @staticmethod
+    def isStore(path):
+        try:
+            with open(path, 'rb') as inF:
+                return inF.read(len(SqliteTaskStore.MAGIC)) == SqliteTaskStore.MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def write(path, taskRecords, generation=0):
+        # Replaced in one transaction, readers see the old history or the new one
+        with SqliteTaskStore(path, True) as store:
+            with store.transaction():
+                store.Connection.execute("DELETE FROM records")
+                store.Connection.executemany("INSERT INTO records (task, start_time, end_time) VALUES (?, ?, ?)",
+                                             ((name, start, end) for name, rows in taskRecords.items() for start, end in rows))
+                store.rebuildRollups()
+                # Punches never go to the journals here, the generation is only kept for converting back
+                store.Connection.execute("CREATE TABLE IF NOT EXISTS journal_generation (generation INTEGER NOT NULL)")
+                store.Connection.execute("DELETE FROM journal_generation")
+                store.Connection.execute("INSERT INTO journal_generation VALUES (?)", (generation,))
+
+
+class PunchCardGrapher:
+    '''Construct a punchcard.
+    Quick'n dirty way.
+    Parameters
+    ==========
+    - timeData: Dictionary of quantities to display.
+            They are indexed by key of type (val1,val2) with
+            val1 included in ax1 and val2 included in ax2.
+    - ax1: list
+            Possible values for first axis (if different than days)
+    - ax2: list
+            Possible values for second axis (if different than hours)
+    - ax1_ticks: list
+            Value to display in ticks of first axis (if different than days)
+    - ax2_ticks: list
+            Value to display in ticks of second axis (if different than days)
+    - ax1_label: String
+            Value to give to first axis (if different than day)
+    - ax2_label: String
+            Value to give to second axis (if different than day)
+    '''
+    DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    DAY = "Day"
+    HOUR = "Hour"
+    HOURS_IN_DAY = 24
+    CIRCLE_COLOR = "GREEN"
+    CARD_VERSION = 1 # Part of every cached card's key, bump it when the look of the cards changes
+
+    HOURS_IN_WEEK = 7 * 24
+    SECONDS_IN_HOUR = 60 * 60
+    EPOCH_WEEKDAY = 3 # 1970-01-01 was a Thursday
+
+    @staticmethod
+    def convertTasksToTimeData(taskList, weightByMinutes=True):
+        grid = PunchCardGrapher.convertTasksToTimeGrid(taskList, weightByMinutes)
+        data = {}
+        for wd, hour in zip(*grid.nonzero()):
+            data[(int(wd), int(hour))] = float(grid[wd, hour])
+        return data
+
+    @staticmethod
+    def convertTasksToTimeGrid(taskList, weightByMinutes=True):
+        import numpy as np
+        if isinstance(taskList, TaskHistory):
+            # Copied straight out of the columns, a view would keep them from growing
+            starts = np.frombuffer(taskList.Starts, dtype=np.int64).copy()
+            ends = np.frombuffer(taskList.Ends, dtype=np.int64).copy()
+            finished = ends != TaskHistory.NO_END
+            return PunchCardGrapher.binEpochsToTimeGrid(starts[finished], ends[finished], weightByMinutes)
+        starts = []
+        ends = []
+        for task in taskList:
+            if task.EndEpoch is None:
+                continue
+            starts.append(task.StartEpoch)
+            ends.append(task.EndEpoch)
+        return PunchCardGrapher.binEpochsToTimeGrid(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64), weightByMinutes)
+
+    @staticmethod
+    def binEpochsToTimeGrid(starts, ends, weightByMinutes=True):
+        '''Bins [start, end) epoch intervals into a 7x24 weekday by hour grid.
+        Each cell holds the minutes worked in that hour of the week, or with
+        weightByMinutes turned off, the number of intervals that touch it.
+        Intervals are split across hour and day boundaries in bulk, no matter
+        how many days they run.
+        '''
+        import numpy as np
+        hour = PunchCardGrapher.SECONDS_IN_HOUR
+        week = PunchCardGrapher.HOURS_IN_WEEK * hour
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+        valid = ends >= starts # you cant end a task before it begins
+        if not valid.all():
+            starts = starts[valid]
+            ends = ends[valid]
+        cellsInWeek = PunchCardGrapher.HOURS_IN_WEEK
+        unit = 60 if weightByMinutes else 1
+        # Whole weeks cover every cell evenly, fold them in up front so at most a week is left
+        weeks = np.maximum(ends - starts - 1, 0) // week
+        grid = np.full(cellsInWeek, float(weeks.sum() * unit))
+        ends -= weeks * week
+        firstHour = starts // hour
+        hoursTouched = np.maximum(ends - 1, starts) // hour - firstHour + 1
+        # Hours since the epoch map onto hours since monday midnight, past the end of the week
+        # is kept unwrapped (at most twice around) so no per interval modulo is needed
+        firstCell = (firstHour + PunchCardGrapher.EPOCH_WEEKDAY * 24) % cellsInWeek
+        endCell = firstCell + hoursTouched
+        # Every touched hour counts as a full one through a difference array...
+        diff = np.bincount(firstCell, minlength=3 * cellsInWeek) - np.bincount(endCell, minlength=3 * cellsInWeek)
+        covered = np.cumsum(diff) * float(unit)
+        if weightByMinutes:
+            # ...then the minutes before the start and after the end are taken back out
+            lead = (starts - firstHour * hour) / 60.0
+            trail = ((firstHour + hoursTouched) * hour - ends) / 60.0
+            covered -= np.bincount(firstCell, weights=lead, minlength=3 * cellsInWeek)
+            covered -= np.bincount(endCell - 1, weights=trail, minlength=3 * cellsInWeek)
+        grid += covered.reshape(3, cellsInWeek).sum(axis=0)
+        return grid.reshape(len(PunchCardGrapher.DAYS), PunchCardGrapher.HOURS_IN_DAY)
+
+    def __init__(self, taskList, weightByMinutes=True, headless=False, timeGrid=None):
+        # Import these here because they take forever to import and aren't needed anywhere else
+        if PROFILER is not None:
+            PROFILER.start("matplotlib import")
+        import numpy as np
+        from matplotlib.collections import EllipseCollection
+        if headless:
+            # Agg draws straight into a buffer so cards can be rendered without a display
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+            self.plot = None
+            self.figure = Figure()
+            FigureCanvasAgg(self.figure)
+        else:
+            import matplotlib.pyplot as plot
+            self.plot = plot
+            self.figure = plot.figure()
+        if PROFILER is not None:
+            PROFILER.stop()
+        axes = self.figure.add_subplot()
+        ax1=range(len(self.DAYS))
+        ax2=range(self.HOURS_IN_DAY)
+        ax1_ticks=self.DAYS
+        ax2_ticks=range(self.HOURS_IN_DAY)
+        ax1_label=self.DAY
+        ax2_label=self.HOUR
+        # build the array which contains the values
+        if timeGrid is None:
+            data = PunchCardGrapher.convertTasksToTimeGrid(taskList, weightByMinutes)
+        else:
+            data = np.asarray(timeGrid, dtype=np.float64).reshape(len(self.DAYS), self.HOURS_IN_DAY)
+        peak = float(np.max(data))
+        if peak > 0:
+            data = data/peak
+
+        # shape ratio
+        r = float(data.shape[1])/data.shape[0]
+        # Draw the punchcard as a single collection holding one circle per non empty element
+        # Ugly normalisation allows to obtain perfect circles instead of ovals....
+        # and sizing both diameters in x units keeps them round whatever the canvas aspect
+        y, x = np.nonzero(data)
+        diameters = data[y, x]/float(data.shape[1])*data.shape[0]
+        circles = EllipseCollection(diameters, diameters, np.zeros(len(diameters)), units='x',
+                                    offsets=np.column_stack((x/float(data.shape[1])*data.shape[0], y/r)),#(X,Y)
+                                    offset_transform=axes.transData, color=self.CIRCLE_COLOR)
+        axes.add_collection(circles)
+
+        axes.set_yticks(np.arange(0,len(ax1)/r-.1,1/r), ax1_ticks)
+        axes.set_xticks(np.arange(len(ax2))/float(data.shape[1])*data.shape[0], ax2_ticks)
+        axes.set_xlabel(ax2_label)
+        axes.set_ylabel(ax1_label)
+
+        # make sure the axes are equal, and resize the canvas to fit the plot
+        # axes.axis('equal') #Commented out to fix infinite zooming on horizontal stretch
+        axes.axis([-.2, 7, (len(ax1)-1)/r+.3, -.3])
+        scale = 0.5
+        self.figure.set_size_inches(data.shape[1]*scale,data.shape[0]*scale, forward=not headless)
+
+    def show(self):
+        if self.plot is None:
+            raise Exception("Display Error: A headless punch card can only be saved!")
+        self.plot.show()
+
+    def save(self, path):
+        # The file format comes from the extension (png, svg, pdf...)
+        self.figure.savefig(path, bbox_inches='tight')
+        if self.plot is not None:
+            self.plot.close(self.figure)
+
+    @staticmethod
+    def cardKey(timeGrid, extension):
+        '''Hash of what a card shows, cards with the same key are the same image'''
+        import hashlib
+        import numpy as np
+        key = hashlib.sha256("{0}:{1}:".format(PunchCardGrapher.CARD_VERSION, extension).encode("ascii"))
+        key.update(np.ascontiguousarray(timeGrid, dtype=np.float64).tobytes())
+        return key.hexdigest()
+
+    @staticmethod
+    def renderCard(timeGrid, path):
+        # Runs in a worker process, which keeps matplotlib imported from one card to the next
+        root, extension = os.path.splitext(path)
+        tmpPath = "{0}.{1}.tmp{2}".format(root, os.getpid(), extension) # Keeps the extension, it picks the format
+        PunchCardGrapher([], True, True, timeGrid).save(tmpPath)
+        os.replace(tmpPath, path)
+
+class Profiler:
+    '''Phase timings and I/O counters of one command.
+    Turned on with --profile[=OPTIONS] or PUNCHCARD_PROFILE=OPTIONS, where
+    OPTIONS is a comma separated list of
+        text             -    a readable report on stderr (the default)
+        json             -    the report as JSON lines on stderr instead
+        cprofile=PATH    -    also dump a cProfile of the command to PATH
+    Phases nest, time spent in one is also counted in the phase around it.
+    Nothing reports to a Profiler unless PROFILER is set, so a command run
+    without one does no timing at all.
+    '''
+
+    def __init__(self, options):
+        self.Json = False
+        self.CProfilePath = None
+        for option in options.split(","):
+            option = option.strip()
+            if option.lower() == "json":
+                self.Json = True
+            elif option.lower().startswith("cprofile="):
+                self.CProfilePath = option[len("cprofile="):]
+            elif option.lower() not in ("", "1", "on", "true", "text"):
+                raise Exception("Argument Error: Unknown profile option '{0}'!".format(option))
+        self.Phases = {} # { Phase: [ seconds, calls ] } in the order they first ran
+        self.Counters = {} # { Counter: total }
+        self.Running = [] # [ (Phase, started) ] innermost last
+        self.Next = None
+
+    @staticmethod
+    def timed(phase, func, *args):
+        # Calls func as a phase of the running profile, or just calls it
+        if PROFILER is None:
+            return func(*args)
+        with PROFILER.phase(phase):
+            return func(*args)
+
+    @staticmethod
+    def count(counter, amount=1):
+        if PROFILER is not None:
+            PROFILER.Counters[counter] = PROFILER.Counters.get(counter, 0) + amount
+
+    def phase(self, phase):
+        self.Next = phase
+        return self
+
+    def __enter__(self):
+        self.start(self.Next)
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self, phase):
+        self.Running.append((phase, time.perf_counter()))
+
+    def stop(self):
+        phase, started = self.Running.pop()
+        totals = self.Phases.setdefault(phase, [0.0, 0])
+        totals[0] += time.perf_counter() - started
+        totals[1] += 1
+
+    def run(self, func, args):
+        profile = None
+        if self.CProfilePath is not None:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            with self.phase("total"):
+                func()
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.CProfilePath)
+            self.report(" ".join(args))
+
+    def report(self, command, out=None):
+        out = out or sys.stderr
+        if self.Json:
+            stamp = Task.date_time_to_date_time_string(datetime.now())
+            for phase, (seconds, calls) in self.Phases.items():
+                print(json.dumps({"Time": stamp, "Command": command, "Phase": phase, "Seconds": seconds, "Calls": calls}), file=out)
+            print(json.dumps({"Time": stamp, "Command": command, "Counters": self.Counters}), file=out)
+            return
+        print("Profile of '{0}'".format(command), file=out)
+        for phase, (seconds, calls) in self.Phases.items():
+            print("    {0:<18} {1:>10.2f} ms {2:>8}x".format(phase, seconds * 1000, calls), file=out)
+        for counter, total in self.Counters.items():
+            print("    {0:<18} {1:>10}".format(counter, total), file=out)
+
+
+class TaskManager():
+    JournalDir = None # Punches get appended to a journal per task in here when set
+    JournalDirLock = None # Shared lock on JournalDir held along with a task's journal, Compact takes it for itself
+    JournalBuffer = None # [ (TaskName, record) ] punches waiting to be appended in one go, None writes every punch straight away
+    OnlyTask = None # The one task loadSaveFile was limited to, if any
+    Writing = False # Whether loadSaveFile opened the store for punches
+    BatchLines = None # Lines of the batch being run
+    Batching = False # Set while runBatch applies its lines, handlers raise what went wrong instead of printing it
+    DaemonCommands = ("punch", "list", "print", "calc")
+    NoDaemon = (ConnectionRefusedError, FileNotFoundError) # What connecting to a socket nobody listens on raises
+    NonSpace = re.compile(r"\S")
+    JournalNameUnsafe = re.compile(r"[^A-Za-z0-9_.-]+")
+    # Lines of bare words and quotes without escapes, which split the same with or without shlex
+    PlainArgs = re.compile(r"""(\s*(?:(?:"[^"\\]*"|'[^']*'|[^\s"'\\#]+)(?:\s+|$))*)(?:#.*)?""", re.S)
+    PlainArg = re.compile(r""""([^"\\]*)"|'([^']*)'|([^\s"'\\#]+)""")
+    JournalNameEscape = re.compile(rb"%([0-9A-F]{2})")
+    LockOffset = 2 ** 31 - 2 # Where a lock on Windows goes, past anything ever written so readers aren't kept out
+
+    def __init__(self):
+        self.resetTables()
+
+    def resetTables(self):
+        # Kept per instance, every process (and every manager in one) works on its own copy of the files
+        if getattr(self, "Store", None) is not None:
+            self.Store.close()
+        self.Tasks = {} # { TaskName: TaskHistory } records sorted by start time
+        self.OpenTasks = {} # { TaskName: [ start epoch ] } records that haven't been punched out of, oldest first
+        self.PendingTasks = {} # { TaskName: [ loader(errorList) ] } loaded records that haven't been decoded yet
+        self.Stats = {} # { TaskName: TaskStats } built on first use and kept up to date by every punch
+        self.JournalOffsets = {} # { JournalPath: bytes of it already applied }
+        self.Generation = 0 # Journal generation of the save file, only the journals of that generation are replayed on top of it
+        self.SaveFingerprint = None # storeFingerprint of the save file as it was loaded
+        self.Store = None # TaskStore of the save file, tasks still pending in it are queried there
+
+    def add(self, task):
+        self.addRecord(task)
+        self.Stats.pop(task.get_name(), None) # Rebuilt from the records the next time it's asked for
+
+    def addRecord(self, task):
+        self.addEpochs(task.get_name(), task.StartEpoch, task.EndEpoch)
+
+    def addEpochs(self, name, start, end=None):
+        if name in self.PendingTasks:
+            self.materialize(name)
+        history = self.Tasks.get(name)
+        if history is None:
+            history = self.Tasks[name] = TaskHistory(name)
+        history.add(start, end)
+        if end is None:
+            openList = self.OpenTasks.setdefault(name, [])
+            openList.insert(bisect_right(openList, start), start)
+
+    def get(self, taskName):
+        if taskName in self.PendingTasks:
+            self.materialize(taskName)
+        if taskName not in self.Tasks.keys():
+            return None
+        return self.Tasks[taskName]
+
+    def taskNames(self):
+        return list(self.Tasks.keys()) + [name for name in self.PendingTasks.keys() if name not in self.Tasks]
+
+    def allTasks(self):
+        for taskName in self.taskNames():
+            yield from self.get(taskName) or []
+
+    def addPending(self, taskName, loader):
+        self.PendingTasks.setdefault(taskName, []).append(loader)
+
+    def addStoreLoader(self, taskName):
+        self.addPending(taskName, lambda errorList: ((start, end) for _, start, end in self.Store.records(taskName, errorList=errorList)))
+
+    def endPending(self, taskName, start, end):
+        # Punches out of a running record of a task that hasn't been decoded yet, once it is
+        loaders = self.PendingTasks[taskName]
+
+        def loader(errorList):
+            ended = False
+            for pending in loaders:
+                for s, e in pending(errorList):
+                    if not ended and s == start and e is None:
+                        ended = True
+                        e = end
+                    yield s, e
+        self.PendingTasks[taskName] = [loader]
+
+    def inStore(self, taskName):
+        # Still only in the store, so questions about it can be asked of the store
+        return self.Store is not None and self.Store.Queryable and taskName in self.PendingTasks
+
+    def forget(self, taskName):
+        # The store changed under a task, it's read back from there next time it's asked for
+        for table in (self.Tasks, self.OpenTasks, self.Stats, self.PendingTasks):
+            table.pop(taskName, None)
+        self.addStoreLoader(taskName)
+
+    def materialize(self, taskName):
+        Profiler.timed("decode", self.decodePending, taskName)
+
+    def decodePending(self, taskName):
+        # Decode the records of one task, the rest of the history stays as it was loaded
+        errorList = []
+        decoded = 0
+        # Loaders yield (start epoch, end epoch or None), no Task is made for any of it
+        for loader in self.PendingTasks.pop(taskName):
+            for start, end in loader(errorList):
+                self.addEpochs(taskName, start, end)
+                decoded += 1
+        Profiler.count("records decoded", decoded)
+        for x in errorList:
+            print(x)
+
+    @staticmethod
+    def decodeEpochs(tStart, tEnd):
+        # TaskStart and TaskEnd strings of a saved record to epochs, end stays None while it's running
+        start = Task.date_time_to_epoch(Task.date_time_string_to_date_time(tStart))
+        end = None
+        if tEnd is not None:
+            end = Task.date_time_to_epoch(Task.date_time_string_to_date_time(tEnd))
+            if end < start:
+                raise Exception("Argument Error: End time cannot be less than start time!")
+        return start, end
+
+    @staticmethod
+    def decodeTaskRows(taskName, rows, errorList):
+        for tStart, tEnd in rows:
+            try:
+                epochs = TaskManager.decodeEpochs(tStart, tEnd)
+            except Exception as e:
+                errorList.append(e)
+                continue
+            yield epochs
+
+    def set(self, taskName, taskData):
+        self.PendingTasks.pop(taskName, None)
+        self.Stats.pop(taskName, None)
+        history = self.Tasks[taskName] = TaskHistory(taskName)
+        for task in sorted(taskData, key=lambda task: task.StartEpoch):
+            history.add(task.StartEpoch, task.EndEpoch)
+        self.OpenTasks[taskName] = [start for start, end in history.epochs() if end is None]
+
+    def getStats(self, taskName):
+        if taskName not in self.Stats and self.inStore(taskName):
+            stats = self.Store.stats(taskName)
+            if stats is not None:
+                self.Stats[taskName] = stats
+        if taskName not in self.Stats:
+            taskList = self.get(taskName)
+            if taskList is None:
+                return None
+            self.Stats[taskName] = TaskStats.from_epochs(taskList.epochs())
+        return self.Stats[taskName]
+
+    def getOpenTask(self, taskName):
+        if taskName in self.PendingTasks:
+            self.materialize(taskName)
+        openList = self.OpenTasks.get(taskName)
+        return Task.from_epochs(taskName, openList[0]) if openList else None
+
+    def getCurrentWeekStart(self):
+        dt = datetime.now()
+        return dt - timedelta(days=dt.weekday())
+
+    def getCurrentWeekEnd(self):
+        dt = datetime.now()
+        start = dt - timedelta(days=dt.weekday())
+        return start + timedelta(days=6)
+
+    @staticmethod
+    def optionalEpoch(dt):
+        return None if dt is None else Task.date_time_to_epoch(dt)
+
+    @staticmethod
+    def midnight(dt):
+        return datetime(dt.year, dt.month, dt.day)
+
+    def calculateSecondsWorked(self, taskName, since=None, until=None, now=None):
+        '''Seconds worked on a task between two midnights, None for open ended.
+        Records that span midnight are split between the days they cover, and
+        running records count up to now, not at all when now is None. Answered
+        from the daily rollups without looking at the records.
+        '''
+        toEpoch = TaskManager.optionalEpoch
+        if taskName not in self.Stats and self.inStore(taskName):
+            return self.Store.workedSeconds(taskName, toEpoch(since), toEpoch(until), toEpoch(now))
+        stats = self.getStats(taskName)
+        if stats is None:
+            raise Exception("Argument Error: The task '{0}' doesn't exist!".format(taskName))
+        return stats.worked_seconds(toEpoch(since), toEpoch(until), toEpoch(now))
+
+    def firstWorkedDay(self, taskName):
+        if taskName not in self.Stats and self.inStore(taskName):
+            first = self.Store.firstStart(taskName)
+            return None if first is None else TaskManager.midnight(Task.epoch_to_date_time(first))
+        stats = self.getStats(taskName)
+        first = None if stats is None else stats.first_day()
+        return None if first is None else Task.epoch_to_date_time(first)
+
+    def calculateHoursSpentInCurrentWeek(self, taskName):
+        weekStart = TaskManager.midnight(self.getCurrentWeekStart())
+        return Task.seconds_to_hours(self.calculateSecondsWorked(taskName, weekStart, weekStart + timedelta(days=7), datetime.now()))
+
+    def calculateTaskPay(self, taskName, hourlyPay, incomeTax):
+        if self.inStore(taskName):
+            return Task.seconds_to_hours(self.Store.workedSeconds(taskName)) * hourlyPay * (1 - incomeTax)
+        taskList = self.get(taskName)
+        if taskList is None:
+            raise Exception("Argument Error: The task '{0}' doesn't exist!".format(taskName))
+        return self.calculateAveragePay(taskList, hourlyPay, incomeTax)
+
+    def calculateAveragePay(self, taskList, hourlyPay, incomeTax):
+        if type(taskList) is TaskHistory:
+            # Summed off the columns, running tasks have no duration yet
+            seconds = sum(end - start for start, end in taskList.epochs() if end is not None)
+            return seconds / 3600 * hourlyPay * (1 - incomeTax)
+        ret = 0
+        for task in taskList:
+            try:
+                ret += (task.get_duration_in_hours() * hourlyPay * (1 - incomeTax))
+            except Exception:
+                pass
+        return ret
+
+    def punchIn(self, taskName, punchTime=None):
+        if self.Store is not None and self.Store.Writable:
+            # Checked and written in one transaction of the store, nothing needs loading
+            task = Task(taskName, punchTime)
+            self.Store.punchIn(taskName, task.StartEpoch)
+            self.forget(taskName)
+            return task
+        journal = self.lockJournal(taskName)
+        try:
+            # Checked against the stats, a task that hasn't been decoded yet stays that way
+            stats = self.getStats(taskName) or TaskStats()
+            if stats.Open:
+                raise Exception("Argument Exception: The task '{0}' must be punched out of before you can punch in!".format(taskName))
+            task = Task(taskName, punchTime)
+            if taskName in self.PendingTasks:
+                self.addPending(taskName, lambda errorList: [(task.StartEpoch, None)])
+            else:
+                self.addRecord(task)
+            stats.punch_in(task.StartEpoch)
+            self.Stats[taskName] = stats
+            self.writeJournal(journal, "in", taskName, task.get_start_time())
+            return task
+        finally:
+            self.unlockJournal(journal)
+
+    def punchOut(self, taskName, punchTime=None):
+        if self.Store is not None and self.Store.Writable:
+            if punchTime is None:
+                punchTime = datetime.now()
+            start = self.Store.punchOut(taskName, Task.date_time_to_epoch(punchTime))
+            self.forget(taskName)
+            return Task(taskName, Task.epoch_to_date_time(start), punchTime)
+        journal = self.lockJournal(taskName)
+        try:
+            stats = self.getStats(taskName)
+            if stats is None:
+                raise Exception("Argument Exception: The task '{0}' must exist to be punched out of!".format(taskName))
+            if not stats.Open:
+                raise Exception("Argument Exception: The task '{0}' must be punched in before you can punch out!".format(taskName))
+            if punchTime is None:
+                punchTime = datetime.now()
+            notPunchedOut = Task.from_epochs(taskName, stats.Open[0])
+            notPunchedOut.set_end_time(punchTime)
+            if notPunchedOut.EndEpoch < notPunchedOut.StartEpoch:
+                raise Exception("Argument Error: End time cannot be less than start time!")
+            stats.punch_out(notPunchedOut.StartEpoch, notPunchedOut.EndEpoch)
+            if taskName in self.PendingTasks:
+                self.endPending(taskName, notPunchedOut.StartEpoch, notPunchedOut.EndEpoch)
+            else:
+                history = self.Tasks[taskName]
+                history.set_end(history.index_of_running(notPunchedOut.StartEpoch), notPunchedOut.EndEpoch)
+                self.OpenTasks[taskName].pop(0)
+            self.writeJournal(journal, "out", taskName, punchTime)
+            return notPunchedOut
+        finally:
+            self.unlockJournal(journal)
+
+    def firstNotPunchedOut(self, taskList):
+        for task in taskList:
+            if task.get_end_time() is None:
+                return task
+        return None
+
+    def __str__(self):
+        return str({taskName: self.get(taskName) for taskName in self.taskNames()})
+
+    def toJson(self, Indent=None):
+        Root = []
+        for task in self.allTasks():
+            Root.append(task.to_dict())
+        return json.dumps(Root, indent=Indent)
+
+    def toEpochRecords(self):
+        records = {}
+        for taskName in self.taskNames():
+            history = self.get(taskName)
+            if history is not None: # A task looked for on its own that the save file doesn't have
+                records[taskName] = list(history.epochs())
+        return records
+
+    def fromJson(self, tasksData):
+        data = json.loads(tasksData)
+        if type(data) is not list:
+            raise Exception("Format Exception: Root of in file isn't a list!")
+        self.Store = JsonTaskStore(None, elements=data)
+        # Timestamps are only decoded once a command asks for the task they belong to
+        for name in self.Store.names():
+            self.addStoreLoader(name)
+        for x in self.Store.Errors:
+            print(x)
+
+    @staticmethod
+    def iterJsonRecords(loadPath, chunkSize=1 << 20):
+        '''Yields the elements under the root list of a JSON save file one at a time.
+        The file is read in chunks so only about a chunk of it is ever in memory,
+        not the whole file and every element parsed out of it.
+        '''
+        decoder = json.JSONDecoder()
+        with open(loadPath, 'r', encoding="utf-8") as inF:
+            buf = ""
+            pos = 0
+            batchable = True # Whether the buffer is worth parsing in one go
+
+            def readMore():
+                nonlocal buf, pos, batchable
+                chunk = inF.read(chunkSize)
+                buf = buf[pos:] + chunk
+                pos = 0
+                batchable = True
+                return len(chunk) > 0
+
+            def peek():
+                # Next non whitespace character, "" at the end of the file
+                nonlocal pos
+                while True:
+                    match = TaskManager.NonSpace.search(buf, pos)
+                    if match is not None:
+                        pos = match.start()
+                        return buf[pos]
+                    pos = len(buf)
+                    if not readMore():
+                        return ""
+
+            if peek() != "[":
+                raise Exception("Format Exception: Root of in file isn't a list!")
+            pos += 1
+            if peek() == "]":
+                return
+            while True:
+                # Parse every whole element in the buffer in one go, a cut anywhere but between two
+                # elements (inside a string or a nested object) leaves something that can't parse
+                cut = buf.rfind("}", pos) if batchable else -1
+                batch = None
+                if cut >= 0:
+                    try:
+                        batch = json.loads("[" + buf[pos:cut + 1] + "]")
+                    except ValueError:
+                        batchable = False # Element by element until more is read, trying again would parse the same text
+                if batch is not None:
+                    yield from batch
+                    pos = cut + 1
+                else:
+                    # Otherwise read more until the next element is complete
+                    while True:
+                        try:
+                            element, end = decoder.raw_decode(buf, pos)
+                        except ValueError:
+                            element, end = None, None
+                        # A number cut off by the end of the buffer still decodes ("1." as 1), it only
+                        # really ended once whatever follows it can come after an element
+                        if end is not None and end < len(buf) and buf[end] in " \t\r\n,]":
+                            break
+                        if not readMore():
+                            if end is None:
+                                raise Exception("Format Exception: '{0}' ends in the middle of an element!".format(loadPath))
+                            break
+                    yield element
+                    pos = end
+                separator = peek()
+                if separator == "]":
+                    return
+                if separator == "":
+                    raise Exception("Format Exception: Root list of '{0}' is never closed!".format(loadPath))
+                if separator != ",":
+                    raise Exception("Format Exception: Expected ',' between elements of '{0}'!".format(loadPath))
+                pos += 1
+                peek()
+
+    @staticmethod
+    def findJsonRecords(loadPath, taskName):
+        '''Returns the elements of one task in a JSON save file without parsing the
+        rest of it, or None when the file can't be searched that way. Each place
+        the name shows up is widened to the braces around it, which is only sure
+        to find every element while nothing in the file is escaped.
+        '''
+        needle = json.dumps(taskName).encode("utf-8")
+        if any(c in needle for c in b"{}\\"):
+            return None
+        with open(loadPath, 'rb') as inF:
+            if os.fstat(inF.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(inF.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:1024].lstrip()[:1] != b"[" or data.find(b"\\") >= 0:
+                    return None
+                spans = []
+                pos = data.find(needle)
+                while pos >= 0:
+                    start = data.rfind(b"{", 0, pos)
+                    end = data.find(b"}", pos)
+                    if start < 0 or end < 0:
+                        return None
+                    spans.append(data[start:end + 1])
+                    pos = data.find(needle, end)
+        try:
+            elements = json.loads(b"[" + b",".join(spans) + b"]")
+        except ValueError:
+            return None # Braces inside strings or nested elements, leave it to the full parse
+        if any(type(element) is not dict for element in elements):
+            return None
+        return [element for element in elements if element.get("TaskName") == taskName]
+
+    @staticmethod
+    def iterJsonEpochs(elements, errorList, taskName=None, since=None, until=None):
+        '''Yields (TaskName, start epoch, end epoch or None) out of the elements of a JSON save file.
+        Records of other tasks are skipped before their timestamps are decoded,
+        since and until are epochs bounding the start time, until is exclusive.
+        Anything that can't be turned into a record goes into errorList.
+        '''
+        for i in elements:
+            if type(i) is not dict:
+                errorList.append(Exception("Format Exception: Element under root list wasn't a dictionary!"))
+                continue
+            if "JournalGeneration" in i:
+                continue
+            try:
+                name = i["TaskName"]
+                if taskName is not None and name != taskName:
+                    continue
+                start, end = TaskManager.decodeEpochs(i["TaskStart"], i.get("TaskEnd"))
+            except Exception as e:
+                errorList.append(e)
+                continue
+            if (since is not None and start < since) or (until is not None and start >= until):
+                continue
+            yield name, start, end
+
+    @staticmethod
+    def iterSaveFileRecords(loadPath, errorList, taskName=None, since=None, until=None):
+        '''Yields (TaskName, start epoch, end epoch or None) out of any save file as it's read.
+        since and until are epochs bounding the start time, until is exclusive.
+        Anything that can't be turned into a record goes into errorList.
+        '''
+        with TaskStore.classFor(loadPath)(loadPath) as store:
+            yield from store.records(taskName, since, until, errorList)
+        errorList.extend(store.Errors)
+
+    @staticmethod
+    def filterRecords(records, since=None, until=None, state=None):
+        # Starts in [since, until), state "open" keeps running records and "closed" the rest
+        for record in records:
+            start, end = record[1], record[2]
+            if (since is not None and start < since) or (until is not None and start >= until):
+                continue
+            if state is not None and (end is None) != (state == "open"):
+                continue
+            yield record
+
+    def streamRecords(self, loadPath, journalDir, taskName=None, since=None, until=None, state=None, errorList=None):
+        '''Yields (TaskName, start epoch, end epoch or None) of the save file with
+        its journals applied, filtered like filterRecords. Records go out as the
+        save file is read and nothing is kept, except for the tasks with punches
+        still in a journal. Those are held in this manager, replayed and yielded
+        last, so memory only grows with the history of uncompacted tasks.
+        '''
+        if errorList is None:
+            errorList = []
+        with TaskStore.classFor(loadPath)(loadPath) if os.path.exists(loadPath) else JsonTaskStore(None) as store:
+            # The save file says which generation of journals goes on top of it
+            self.Generation = store.generation()
+            journalDir = TaskManager.generationDir(journalDir, self.Generation)
+            journaled = {name for name in TaskManager.journalTaskNames(journalDir) if os.path.getsize(TaskManager.journalFile(journalDir, name)) > 0}
+            if taskName is not None:
+                journaled &= {taskName}
+            # A journal can punch out of a record from before the range, so held tasks are read whole
+            records = store.records(taskName, *((None, None) if journaled else (since, until)), errorList=errorList)
+
+            def unjournaled():
+                for record in records:
+                    if record[0] in journaled:
+                        self.addEpochs(*record) # Held until its journal is replayed
+                    else:
+                        yield record
+
+            yield from TaskManager.filterRecords(unjournaled(), since, until, state)
+        errorList.extend(store.Errors)
+        for name in sorted(journaled):
+            self.replayJournal(TaskManager.journalFile(journalDir, name), name)
+            history = self.get(name)
+            if history is not None:
+                yield from TaskManager.filterRecords(((name, start, end) for start, end in history.epochs()), since, until, state)
+
+    @staticmethod
+    def writeRecords(records, outF, fmt, chunkSize=4096):
+        '''Writes (TaskName, start epoch, end epoch or None) records to outF as CSV
+        under a header row or as a JSON object per line, chunkSize records at a
+        time. Returns how many were written.
+        '''
+        import csv
+        import io
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(("TaskName", "TaskStart", "TaskEnd"))
+        days = {} # Only the time of day is formatted per record, the date is shared by the whole day
+        quoted = {} # Task names as JSON strings
+
+        def toString(epoch):
+            if epoch is None:
+                return None
+            day, seconds = divmod(epoch, TaskStats.SECONDS_IN_DAY)
+            date = days.get(day)
+            if date is None:
+                if len(days) > chunkSize:
+                    days.clear()
+                date = days[day] = Task.date_time_to_date_time_string(Task.epoch_to_date_time(day * TaskStats.SECONDS_IN_DAY))[:11]
+            return "%s%02d:%02d:%02d" % (date, seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+        count = 0
+        for name, start, end in records:
+            start, end = toString(start), toString(end)
+            if fmt == "csv":
+                writer.writerow((name, start, end or ""))
+            else:
+                if name not in quoted:
+                    quoted[name] = json.dumps(name)
+                buf.write('{"TaskName": %s, "TaskStart": "%s", "TaskEnd": %s}\n' % (quoted[name], start, "null" if end is None else '"' + end + '"'))
+            count += 1
+            if count % chunkSize == 0:
+                outF.write(buf.getvalue())
+                buf.seek(0)
+                buf.truncate()
+        outF.write(buf.getvalue())
+        outF.flush()
+        Profiler.count("records written", count)
+        return count
+
+    def store(self, storePath):
+        Profiler.timed("store", self.writeStore, storePath)
+        if PROFILER is not None:
+            Profiler.count("bytes written", os.path.getsize(storePath))
+
+    def writeStore(self, storePath):
+        storeClass = TaskStore.classFor(storePath)
+        storeClass.write(storePath, self.toEpochRecords(), self.Generation)
+        if not storeClass.Writable:
+            self.storeStats(storePath) # A store punches go into changes without being rewritten, there's no fingerprint to pin stats to
+
+    @staticmethod
+    def statsPath(storePath):
+        return storePath + ".stats"
+
+    @staticmethod
+    def storeFingerprint(storePath):
+        # None when there's no save file yet, the inode tells a file swapped in by os.replace from one only appended to
+        try:
+            info = os.stat(storePath)
+        except FileNotFoundError:
+            return None
+        return [info.st_size, info.st_mtime_ns, info.st_ino]
+
+    def storeIfUnchanged(self, storePath):
+        '''Stores only if nobody else has written storePath since it was loaded.
+        Returns whether it stored, on False reload and try again. The lock is only
+        held to compare and write, never while a command runs.
+        '''
+        lock = TaskManager.openLocked(storePath + ".lock")
+        try:
+            if TaskManager.storeFingerprint(storePath) != self.SaveFingerprint:
+                return False
+            self.store(storePath)
+            self.SaveFingerprint = TaskManager.storeFingerprint(storePath)
+            return True
+        finally:
+            TaskManager.closeLocked(lock)
+
+    @staticmethod
+    def lockFile(f, shared=False):
+        '''Waits for a lock on the open file f, shared ones only keep exclusive
+        ones out. Windows has no shared lock to wait for, every lock is exclusive
+        there. Let go of it with unlockFile before closing f.
+        '''
+        if os.name == "nt":
+            import msvcrt
+            # Windows keeps everyone else from reading what's locked, so a byte past the data is
+            f.seek(TaskManager.LockOffset)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    pass # LK_LOCK gives up after ten seconds, carry on waiting like flock does
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+    @staticmethod
+    def unlockFile(f):
+        if os.name == "nt":
+            import msvcrt
+            f.seek(TaskManager.LockOffset)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def openLocked(path, shared=False):
+        # Opened to append and read, and locked, closeLocked lets go of both
+        f = open(path, 'a+b')
+        try:
+            TaskManager.lockFile(f, shared)
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    @staticmethod
+    def closeLocked(f):
+        try:
+            TaskManager.unlockFile(f)
+        finally:
+            f.close()
+
+    def storeStats(self, storePath):
+        '''Writes the stats of every task next to the save file: a header line
+        tagged with the save file, a save file changed behind its back makes it
+        stale, and the offset and length of each task's entry after it. The
+        entries follow one per line, so one task is read without the rest.
+        '''
+        index = {}
+        entries = []
+        offset = 0
+        for taskName in self.taskNames():
+            stats = self.getStats(taskName)
+            if stats is None:
+                continue
+            entry = (json.dumps(stats.to_dict()) + "\n").encode("utf-8")
+            index[taskName] = [offset, len(entry)]
+            entries.append(entry)
+            offset += len(entry)
+        tmpPath = TaskManager.statsPath(storePath) + ".tmp"
+        with open(tmpPath, 'wb') as outF:
+            outF.write((json.dumps({"SaveFile": TaskManager.storeFingerprint(storePath), "Tasks": index}) + "\n").encode("utf-8"))
+            outF.write(b"".join(entries))
+        os.replace(tmpPath, TaskManager.statsPath(storePath))
+
+    def loadStats(self, loadPath, onlyTask=None):
+        # Returns whether the stats were up to date, then they have an entry for every task of the save file
+        try:
+            with open(TaskManager.statsPath(loadPath), 'rb') as inF:
+                root = json.loads(inF.readline())
+                if root["SaveFile"] != TaskManager.storeFingerprint(loadPath):
+                    return False
+                entriesOffset = inF.tell()
+                index = root["Tasks"] if onlyTask is None else {onlyTask: root["Tasks"][onlyTask]} if onlyTask in root["Tasks"] else {}
+                stats = {}
+                for taskName, (offset, length) in index.items():
+                    inF.seek(entriesOffset + offset)
+                    stats[taskName] = TaskStats.from_dict(json.loads(inF.read(length)))
+            self.Stats.update(stats)
+            return True
+        except Exception:
+            return False # Stats are rebuilt from the records when they can't be trusted
+
+    def load(self, loadPath, taskName=None, writable=False):
+        # With a taskName only that task's records are kept, for commands that never look at the others
+        self.Store = TaskStore.classFor(loadPath)(loadPath, writable)
+        self.Generation = self.Store.generation()
+        statsLoaded = not self.Store.Writable and Profiler.timed("stats", self.loadStats, loadPath, taskName)
+        # The store stays open so tasks can be read out of it when they're first asked for
+        if taskName is None:
+            names = self.Store.names()
+        elif statsLoaded:
+            names = [taskName] if taskName in self.Stats else []
+        elif self.Store.Queryable:
+            names = [taskName] if self.Store.hasTask(taskName) else []
+        else:
+            names = [taskName] # Searched for once it's asked for, a task the save file doesn't have decodes to nothing
+        for name in names:
+            self.addStoreLoader(name)
+        for x in self.Store.Errors:
+            print(x)
+
+    @staticmethod
+    def safeFileName(taskName):
+        # Task names are escaped so any of them makes a safe file name
+        escape = lambda m: "".join("%{0:02X}".format(b) for b in m.group().encode("utf-8"))
+        return TaskManager.JournalNameUnsafe.sub(escape, taskName)
+
+    @staticmethod
+    def journalFile(journalDir, taskName):
+        return os.path.join(journalDir, TaskManager.safeFileName(taskName) + ".journal")
+
+    @staticmethod
+    def journalTaskNames(journalDir):
+        if journalDir is None or not os.path.isdir(journalDir):
+            return []
+        unescape = lambda m: bytes([int(m.group(1), 16)])
+        return sorted(TaskManager.JournalNameEscape.sub(unescape, f[:-len(".journal")].encode("utf-8")).decode("utf-8")
+                      for f in os.listdir(journalDir) if f.endswith(".journal"))
+
+    @staticmethod
+    def journalLockFile(journalDir):
+        return os.path.join(journalDir, ".lock")
+
+    @staticmethod
+    def generationDir(journalDir, generation):
+        # Journals of a generation are only ever replayed on top of the save file of that generation
+        if journalDir is None or generation == 0:
+            return journalDir
+        return os.path.join(journalDir, str(generation))
+
+    def lockJournal(self, taskName):
+        '''Opens the task's journal, locks it and catches up with whatever other
+        processes appended to it. Punches made while it's held are checked against
+        the latest records of the task, so two processes punching the same task
+        can't both punch in. Other tasks have their own journals and never wait.
+        Returns None when punches aren't written straight to a journal, hand what
+        it returns to unlockJournal.
+        '''
+        if self.JournalDir is None or self.JournalBuffer is not None:
+            return None
+        os.makedirs(self.JournalDir, exist_ok=True)
+        if self.JournalDirLock is None:
+            self.JournalDirLock = TaskManager.openLocked(TaskManager.journalLockFile(self.JournalDir), shared=True)
+        journal = None
+        try:
+            if TaskManager.storeFingerprint(SAVE_FILE) != self.SaveFingerprint:
+                self.reload() # Compacted by another process since it was read, start over from the new save file
+            journalDir = TaskManager.generationDir(self.JournalDir, self.Generation)
+            os.makedirs(journalDir, exist_ok=True)
+            journal = TaskManager.openLocked(TaskManager.journalFile(journalDir, taskName))
+            self.catchUpJournal(taskName, journal)
+        except BaseException:
+            self.unlockJournal(journal)
+            raise
+        return journal
+
+    def unlockJournal(self, journal):
+        if journal is not None:
+            TaskManager.closeLocked(journal)
+        if self.JournalDirLock is not None:
+            TaskManager.closeLocked(self.JournalDirLock)
+            self.JournalDirLock = None
+
+    def catchUpJournal(self, taskName, journal):
+        # Journals are only appended to until a compact moves on to the next generation
+        if journal.seek(0, os.SEEK_END) > self.JournalOffsets.get(journal.name, 0):
+            self.replayJournal(journal.name, taskName)
+
+    def reload(self):
+        journalDir = self.JournalDir
+        self.resetTables()
+        self.loadSaveFile(self.OnlyTask, self.Writing)
+        self.JournalDir = journalDir
+
+    def writeJournal(self, journal, event, taskName, eventTime):
+        if self.JournalDir is None:
+            return
+        record = json.dumps({"Event": event, "TaskName": taskName, "Time": Task.date_time_to_date_time_string(eventTime)})
+        if self.JournalBuffer is not None:
+            self.JournalBuffer.append((taskName, record))
+            return
+        self.JournalOffsets[journal.name] = TaskManager.appendJournal(journal, [record])
+
+    @staticmethod
+    def appendJournal(journal, records):
+        # One write per batch of punches, the cost doesn't depend on how much history there is
+        data = "".join(record + "\n" for record in records)
+        if journal.seek(0, os.SEEK_END) > 0:
+            journal.seek(-1, os.SEEK_END)
+            if journal.read(1) != b"\n":
+                data = "\n" + data # Start fresh after a record torn by a crash
+        data = data.encode("utf-8")
+        journal.write(data)
+        journal.flush()
+        os.fsync(journal.fileno())
+        Profiler.count("bytes written", len(data))
+        return journal.tell()
+
+    def flushJournal(self, locked=False):
+        # locked when the caller holds the journal directory for itself and has caught up with every journal
+        if not self.JournalBuffer:
+            return
+        os.makedirs(self.JournalDir, exist_ok=True)
+        byTask = {}
+        for taskName, record in self.JournalBuffer:
+            byTask.setdefault(taskName, []).append(record)
+        dirLock = None if locked else TaskManager.openLocked(TaskManager.journalLockFile(self.JournalDir), shared=True)
+        try:
+            if not locked and TaskManager.storeFingerprint(SAVE_FILE) != self.SaveFingerprint:
+                # Compacted since it was read, which folded in everything flushed so far
+                self.SaveFingerprint = TaskManager.storeFingerprint(SAVE_FILE)
+                with TaskStore.classFor(SAVE_FILE)(SAVE_FILE) if os.path.exists(SAVE_FILE) else JsonTaskStore(None) as store:
+                    self.Generation = store.generation()
+            journalDir = TaskManager.generationDir(self.JournalDir, self.Generation)
+            os.makedirs(journalDir, exist_ok=True)
+            for taskName, records in byTask.items():
+                # One at a time, however many tasks were punched
+                path = TaskManager.journalFile(journalDir, taskName)
+                if locked:
+                    with open(path, 'a+b') as journal:
+                        self.JournalOffsets[path] = TaskManager.appendJournal(journal, records)
+                    continue
+                journal = TaskManager.openLocked(path)
+                try:
+                    TaskManager.appendJournal(journal, records)
+                finally:
+                    TaskManager.closeLocked(journal)
+        finally:
+            if dirLock is not None:
+                TaskManager.closeLocked(dirLock)
+        self.JournalBuffer = []
+
+    def replayJournals(self, journalDir, taskName=None):
+        if journalDir is None:
+            return # Punches aren't journaled, they're already in the save file
+        journalDir = TaskManager.generationDir(journalDir, self.Generation)
+        names = TaskManager.journalTaskNames(journalDir) if taskName is None else [taskName]
+        for name in names:
+            path = TaskManager.journalFile(journalDir, name)
+            if os.path.exists(path):
+                self.replayJournal(path, name)
+
+    def replayJournal(self, journalPath, taskName=None):
+        # Only what was appended since the journal was last read gets applied
+        errorList = []
+        offset = self.JournalOffsets.get(journalPath, 0)
+        with open(journalPath, 'rb') as inF:
+            inF.seek(offset)
+            data = inF.read()
+        # A record after the last newline is torn by a crash or still being written, it's left for later
+        data = data[:data.rfind(b"\n") + 1]
+        Profiler.count("bytes read", len(data))
+        journalDir, self.JournalDir = self.JournalDir, None # Replayed punches are already journaled
+        try:
+            for lineNumber, line in enumerate(data.splitlines(), 1):
+                try:
+                    record = json.loads(line)
+                    if taskName is not None and record["TaskName"] != taskName:
+                        continue
+                    self.applyJournalRecord(record)
+                except Exception as e:
+                    errorList.append(Exception("Journal Error: '{0}' line {1}: {2}".format(journalPath, lineNumber, e)))
+        finally:
+            self.JournalDir = journalDir
+        self.JournalOffsets[journalPath] = offset + len(data)
+        for x in errorList:
+            print(x)
+
+    def applyJournalRecord(self, record):
+        taskName = record["TaskName"]
+        eventTime = Task.date_time_string_to_date_time(record["Time"])
+        if record["Event"] not in ("in", "out"):
+            raise Exception("Format Exception: Unknown journal event '{0}'!".format(record["Event"]))
+        if record["Event"] == "in":
+            return self.punchIn(taskName, eventTime)
+        return self.punchOut(taskName, eventTime)
+
+    def catchUpJournals(self, storePath, journalDir):
+        # With the journal directory locked for itself, nobody appends while this reads
+        if TaskManager.storeFingerprint(storePath) != self.SaveFingerprint:
+            self.reload() # Compacted by another process since it was read
+        else:
+            self.replayJournals(journalDir)
+
+    def compact(self, storePath, journalDir):
+        if self.Store.Writable:
+            self.Store.compact() # Punches never went to the journals
+            return
+        if journalDir is None:
+            return # Nothing to fold, runStoring writes the save file if nobody else did since it was loaded
+        # Punches hold the directory lock shared, with it held here no journal is open anywhere else
+        os.makedirs(journalDir, exist_ok=True)
+        dirLock = TaskManager.openLocked(TaskManager.journalLockFile(journalDir))
+        try:
+            self.catchUpJournals(storePath, journalDir)
+            # The save file is swapped in along with the generation it starts, the journals it folded in are never replayed again
+            self.Generation += 1
+            try:
+                self.store(storePath)
+            except BaseException:
+                self.Generation -= 1
+                raise
+            self.SaveFingerprint = TaskManager.storeFingerprint(storePath)
+            self.JournalOffsets = {}
+            # Journals of older generations are only cleared out, whatever is left behind is ignored
+            current = TaskManager.generationDir(journalDir, self.Generation)
+            for name in os.listdir(journalDir):
+                path = os.path.join(journalDir, name)
+                if name.endswith(".journal"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass # Still open for reading on Windows
+                elif name.isdigit() and path != current:
+                    shutil.rmtree(path, ignore_errors=True)
+        finally:
+            TaskManager.closeLocked(dirLock)
+
+    def run(self, args):
+        global SAVE_FILE, JOURNAL_DIR, SOCKET_FILE
+        if len(args) == 0 or (len(args) == 1 and args[0].lower() not in ("compact", "daemon")):
+            print(HELP_DOC)
+            return
+        first = args[0].lower()
+        if first == "convert":
+            self.handleConvertArg(args[1:])
+            return
+        if first == "report":
+            self.handleReportArg(args[1:])
+            return
+        if first == "daemon":
+            self.handleDaemonArg(args[1:])
+            return
+        if os.path.exists(SOCKET_FILE):
+            try:
+                if first in self.DaemonCommands:
+                    print(TaskManager.sendToDaemon(SOCKET_FILE, args), end="")
+                    return
+                # Anything the daemon doesn't answer runs here, once its punches are on disk
+                TaskManager.sendToDaemon(SOCKET_FILE, ["Flush"])
+                if first == "batch":
+                    print("Daemon Error: Stop the daemon before running a batch, it wouldn't see the batch's punches!")
+                    return
+            except TaskManager.NoDaemon:
+                pass # Left behind by a daemon that's gone, carry on without it
+            except OSError as e:
+                # The daemon may have applied the command already, running it here as well could apply it twice
+                print("Daemon Error: Talking to the daemon on '{0}' failed: {1}".format(SOCKET_FILE, e))
+                return
+        if first == "export" and len(args) > 1 and args[1].lower() == "records":
+            # Streamed straight out of the files, only tasks with journaled punches are ever loaded
+            Profiler.timed("command", self.handleExportRecordsArg, args[2:])
+            return
+        if first == "batch":
+            self.BatchLines = TaskManager.readBatchLines(args[1:])
+            if self.BatchLines is None:
+                return
+        onlyTask = TaskManager.singleTaskArg(args)
+        writing = first in ("punch", "batch", "compact")
+        if first == "punch" and len(args) in (3, 4) and (JOURNAL_DIR is not None or TaskStore.classFor(SAVE_FILE).Writable):
+            onlyTask = args[2] # Checked against its own records and journal or by the store, no other task has to be looked at
+        try:
+            if not Profiler.timed("load", self.loadSaveFile, onlyTask, writing):
+                return
+            if writing and self.JournalDir is None and not self.Store.Writable:
+                Profiler.timed("command", self.runStoring, args)
+                return
+            Profiler.timed("command", self.dispatch, args)
+        finally:
+            if self.Store is not None:
+                self.Store.close()
+
+    @staticmethod
+    def readBatchLines(args):
+        if len(args) != 1:
+            print("Argument Error: Batch needs a file to read commands from, or - for standard input!")
+            print(HELP_DOC)
+            return None
+        if args[0] == "-":
+            return sys.stdin.read().splitlines()
+        try:
+            with open(args[0], 'r', encoding="utf-8") as inF:
+                return inF.read().splitlines()
+        except OSError:
+            print("IO Error: Reading batch file '{0}' failed!".format(args[0]))
+            return None
+
+    def runBatch(self, lines):
+        '''Applies a command per line against what's loaded, in the same grammar
+        as the command line. Quotes work like in a shell and # starts a comment.
+        Punches can carry a time and are kept together until the end: in one
+        append per journal, or one transaction of a store, or one save. The
+        journal directory is locked for the whole batch, like Compact does.
+        '''
+        import shlex
+        commands = [] # [ (line number, args or the error splitting them) ]
+        for lineNumber, line in enumerate(lines, 1):
+            try:
+                # shlex is slow enough to be most of a big import, most lines don't need it
+                plain = TaskManager.PlainArgs.fullmatch(line)
+                if plain:
+                    args = [a + b + c for a, b, c in TaskManager.PlainArg.findall(plain.group(1))]
+                else:
+                    args = shlex.split(line, comments=True)
+            except ValueError as e:
+                args = e
+            if type(args) is ValueError or len(args) > 0:
+                commands.append((lineNumber, args))
+        failed = 0
+        dirLock = None
+        buffered = self.JournalDir is not None and self.JournalBuffer is None
+        self.Batching = True
+        try:
+            if buffered:
+                # One lock however many tasks it punches, punches of other processes wait until it's written
+                os.makedirs(self.JournalDir, exist_ok=True)
+                dirLock = TaskManager.openLocked(TaskManager.journalLockFile(self.JournalDir))
+                self.catchUpJournals(SAVE_FILE, self.JournalDir)
+                self.JournalBuffer = []
+            with self.Store.transaction():
+                for lineNumber, args in commands:
+                    try:
+                        if type(args) is ValueError:
+                            raise args
+                        self.applyBatchCommand(args)
+                    except Exception as e:
+                        print("Batch Error: Line {0}: {1}".format(lineNumber, e))
+                        failed += 1
+            if buffered:
+                self.flushJournal(True)
+        finally:
+            self.Batching = False
+            if buffered:
+                self.JournalBuffer = None
+            if dirLock is not None:
+                TaskManager.closeLocked(dirLock)
+        print("Batch applied {0} of {1} commands".format(len(commands) - failed, len(commands)))
+
+    def applyBatchCommand(self, args):
+        first = args[0].lower()
+        if first == "punch":
+            if len(args) not in (3, 4) or args[1][:1].lower() not in ("i", "o"):
+                raise Exception("Argument Error: Punch takes in or out, a task name and optionally a time!")
+            punchTime = Task.date_time_string_to_date_time(args[3]) if len(args) == 4 else None
+            if args[1][0].lower() == "i":
+                self.punchIn(args[2], punchTime)
+            else:
+                self.punchOut(args[2], punchTime)
+        elif first in ("batch", "compact", "daemon", "convert", "report"):
+            raise Exception("Argument Error: '{0}' can't be run inside a batch!".format(args[0]))
+        elif first not in ("list", "print", "display", "calc", "export"):
+            raise Exception("Argument Error: Unknown command '{0}'!".format(args[0]))
+        else:
+            self.dispatch(args) # Batching makes the handlers raise, the line fails with just the error
+
+    def runStoring(self, args):
+        # Without journals a punch rewrites the save file, so it's only kept if nobody else rewrote it meanwhile
+        import io
+        from contextlib import redirect_stdout
+        for attempt in range(STORE_RETRIES):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.dispatch(args)
+            try:
+                if self.storeIfUnchanged(SAVE_FILE):
+                    print(output.getvalue(), end="")
+                    return
+            except Exception as e:
+                print("IO Error: Exporting to save file '{0}' failed!".format(SAVE_FILE))
+                return
+            self.reload()
+        print("IO Error: Save file '{0}' kept changing, gave up after {1} tries!".format(SAVE_FILE, STORE_RETRIES))
+
+    def loadSaveFile(self, onlyTask=None, writing=False):
+        # Returns False when nothing should be run against what got loaded, writing opens the store for punches
+        self.OnlyTask = onlyTask
+        self.Writing = writing
+        self.SaveFingerprint = TaskManager.storeFingerprint(SAVE_FILE) # Taken first, a save file replaced while it's read just looks changed
+        if TaskStore.classFor(SAVE_FILE).Writable:
+            # Punches go straight into the store, there are no journals to replay and nothing to fall back on
+            try:
+                self.load(SAVE_FILE, onlyTask, writing)
+            except Exception as e:
+                print("IO Error: Opening save file '{0}' failed: {1}".format(SAVE_FILE, e))
+                return False
+            return True
+        try:
+            self.load(SAVE_FILE, onlyTask)
+        except Exception:
+            print("Warning: Loading from save file '{0}' failed!".format(SAVE_FILE))
+            self.resetTables()
+            self.Store = JsonTaskStore(None) # Carry on with the journals alone
+        try:
+            Profiler.timed("journals", self.replayJournals, JOURNAL_DIR, onlyTask)
+        except Exception:
+            print("Warning: Replaying journals in '{0}' failed!".format(JOURNAL_DIR))
+        self.JournalDir = JOURNAL_DIR
+        return True
+
+    def dispatch(self, args):
+        # Runs one command against what's loaded, returns whether it changed anything
+        first = args[0].lower()
+        if first == "punch":
+            self.handlePunchArg(args[1:])
+            return True
+        elif first == "batch":
+            self.runBatch(self.BatchLines)
+            return True
+        elif first == "list":
+            self.handleListArg(args[1:])
+        elif first == "print":
+            self.handlePrintArg(args[1:])
+        elif first == "display":
+            self.handleDisplayArg(args[1:])
+        elif first == "calc":
+            self.handleCalcArg(args[1:])
+        elif first == "export":
+            self.handleExportArg(args[1:])
+        elif first == "compact":
+            if len(args) != 1:
+                print("Argument Error: Compact doesn't take any arguments!")
+                print(HELP_DOC)
+                return False
+            try:
+                self.compact(SAVE_FILE, JOURNAL_DIR)
+            except Exception as e:
+                print("IO Error: Compacting into save file '{0}' failed!".format(SAVE_FILE))
+        else:
+            print("Argument Error: Unknown argument '{0}' was specified!".format(first))
+            print(HELP_DOC)
+        return False
+
+    def fail(self, message, usage=False):
+        '''Reports why a command failed, with the help when usage is True. In a
+        batch it raises instead, so the line fails with just the message.
+        '''
+        if self.Batching:
+            raise Exception(message)
+        print(message)
+        if usage:
+            print(HELP_DOC)
+
+    @staticmethod
+    def sendToDaemon(socketPath, args):
+        # Raises one of NoDaemon when nothing got to a daemon, any other error may come after it ran the command
+        import socket
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socketPath)
+            sock.sendall((json.dumps({"Args": args}) + "\n").encode("utf-8"))
+            with sock.makefile('rb') as inF:
+                reply = inF.readline()
+        if not reply:
+            raise ConnectionError("The daemon closed the connection without answering")
+        return json.loads(reply)["Output"]
+
+    def handleDaemonArg(self, args):
+        if len(args) == 1 and args[0].lower() == "stop":
+            try:
+                print(TaskManager.sendToDaemon(SOCKET_FILE, ["Stop"]), end="")
+            except TaskManager.NoDaemon:
+                print("Daemon Error: No daemon is listening on '{0}'!".format(SOCKET_FILE))
+            except OSError as e:
+                print("Daemon Error: Talking to the daemon on '{0}' failed: {1}".format(SOCKET_FILE, e))
+            return
+        if len(args) != 0:
+            print("Argument Error: Daemon only takes 'Stop'!")
+            print(HELP_DOC)
+            return
+        if JOURNAL_DIR is None:
+            print("Daemon Error: The daemon writes punches to the journals, JOURNAL_DIR can't be None!")
+            return
+        if os.path.exists(SOCKET_FILE):
+            try:
+                TaskManager.sendToDaemon(SOCKET_FILE, ["Flush"])
+                print("Daemon Error: A daemon is already listening on '{0}'!".format(SOCKET_FILE))
+                return
+            except TaskManager.NoDaemon:
+                os.remove(SOCKET_FILE) # Stale socket of a daemon that didn't shut down cleanly
+            except OSError as e:
+                print("Daemon Error: Talking to the daemon on '{0}' failed: {1}".format(SOCKET_FILE, e))
+                return
+        import asyncio
+        if not self.loadSaveFile(writing=True):
+            return
+        print("Listening on '{0}'".format(SOCKET_FILE))
+        asyncio.run(self.serve(SOCKET_FILE))
+
+    async def serve(self, socketPath):
+        '''Answers commands from clients until one of them sends Stop.
+        Everything runs on one event loop so commands apply one at a time and
+        none of them can step on another's update. Punches are collected and
+        appended to the journal together every DAEMON_FLUSH_SECONDS.
+        '''
+        import asyncio
+        self.JournalBuffer = []
+        self.StopEvent = asyncio.Event()
+        server = await asyncio.start_unix_server(self.handleClient, path=socketPath)
+        try:
+            async with server:
+                while not self.StopEvent.is_set():
+                    try:
+                        await asyncio.wait_for(self.StopEvent.wait(), DAEMON_FLUSH_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    self.flushJournal()
+        finally:
+            self.flushJournal()
+            if os.path.exists(socketPath):
+                os.remove(socketPath)
+
+    async def handleClient(self, reader, writer):
+        # One command per connection
+        try:
+            line = await reader.readline()
+            try:
+                output = self.answerDaemonRequest(json.loads(line)["Args"])
+            except Exception as e:
+                output = "Daemon Error: {0}\n".format(e)
+            writer.write((json.dumps({"Output": output}) + "\n").encode("utf-8"))
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def answerDaemonRequest(self, args):
+        import io
+        from contextlib import redirect_stdout
+        first = args[0].lower() if len(args) > 0 else ""
+        if first == "flush":
+            self.flushJournal()
+            return ""
+        if first == "stop":
+            self.StopEvent.set()
+            return "Daemon stopped\n"
+        if first not in self.DaemonCommands:
+            return "Daemon Error: '{0}' has to be run without the daemon!\n".format(first)
+        # Handlers print their results, hand whatever they print back to the client
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.dispatch(args)
+        return output.getvalue()
+
+    @staticmethod
+    def singleTaskArg(args):
+        # The task a read only command is limited to, None when it needs everything
+        words = [a.lower() for a in args[:3]]
+        if words[:2] in (["list", "task"], ["print", "summary"], ["display", "tasks"]) and len(args) == 3:
+            return args[2]
+        if words[:2] == ["export", "task"] and len(args) == 4:
+            return args[2]
+        if words[:3] == ["calc", "avg", "pay"] and len(args) >= 5:
+            return args[3]
+        if words[:2] in (["calc", "hours"], ["calc", "pay"]) and len(args) >= 3:
+            return args[2]
+        return None
+
+    @staticmethod
+    def summarizeStoreFile(storePath):
+        '''Boils one save file down to what a team report needs.
+        Runs in a worker process, so only the small aggregate travels back:
+        hours per task, hours per week (keyed by the monday it starts on) and
+        the 168 minutes of the weekday by hour grid.
+        '''
+        import numpy as np
+        errorList = []
+        names = {}
+        nameIds = []
+        starts = []
+        ends = []
+        count = 0
+        for name, start, end in TaskManager.iterSaveFileRecords(storePath, errorList):
+            count += 1
+            if end is None:
+                continue
+            nameIds.append(names.setdefault(name, len(names)))
+            starts.append(start)
+            ends.append(end)
+        nameIds = np.array(nameIds, dtype=np.int64)
+        starts = np.array(starts, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+        hours = (ends - starts) / float(PunchCardGrapher.SECONDS_IN_HOUR)
+        taskHours = np.bincount(nameIds, weights=hours, minlength=len(names))
+        days = starts // TaskStats.SECONDS_IN_DAY
+        weeks, weekIds = np.unique((days - (days + PunchCardGrapher.EPOCH_WEEKDAY) % 7) * TaskStats.SECONDS_IN_DAY, return_inverse=True)
+        weekHours = np.bincount(weekIds, weights=hours, minlength=len(weeks))
+        grid = PunchCardGrapher.binEpochsToTimeGrid(starts, ends)
+        return {"Records": count + len(errorList),
+                "Tasks": {name: float(taskHours[i]) for name, i in names.items()},
+                "Weeks": {int(week): float(h) for week, h in zip(weeks, weekHours)},
+                "Grid": grid.ravel().tolist(),
+                "Errors": [str(e) for e in errorList]}
+
+    @staticmethod
+    def mergeSummaries(summaries):
+        merged = {"Files": 0, "Records": 0, "Tasks": {}, "Weeks": {}, "Grid": [0.0] * PunchCardGrapher.HOURS_IN_WEEK}
+        for summary in summaries:
+            merged["Files"] += 1
+            merged["Records"] += summary["Records"]
+            for key in ("Tasks", "Weeks"):
+                for name, hours in summary[key].items():
+                    merged[key][name] = merged[key].get(name, 0) + hours
+            merged["Grid"] = [a + b for a, b in zip(merged["Grid"], summary["Grid"])]
+        return merged
+
+    def handleReportArg(self, args):
+        if len(args) < 2 or args[0].lower() != "team" or len(args) > 3:
+            print("Argument Error: Report needs 'Team', a directory of save files and optionally an output file!")
+            print(HELP_DOC)
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            paths = sorted(os.path.join(args[1], f) for f in os.listdir(args[1]) if f.endswith((".json", BinaryTaskStore.EXTENSION, SqliteTaskStore.EXTENSION)))
+        except OSError as e:
+            print("Report Error: " + str(e))
+            return
+        if len(paths) == 0:
+            print("Report Error: No save files found in '{0}'!".format(args[1]))
+            return
+        summaries = []
+        # Each worker parses whole files on its own, only the aggregates come back to be merged
+        with ProcessPoolExecutor() as pool:
+            futures = [pool.submit(TaskManager.summarizeStoreFile, path) for path in paths]
+            for path, future in zip(paths, futures):
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    print("Report Error: Summarizing '{0}' failed: {1}".format(path, e))
+                    continue
+                for error in summary["Errors"]:
+                    print("{0}: {1}".format(path, error))
+                summaries.append(summary)
+        merged = TaskManager.mergeSummaries(summaries)
+        print("Team report of {0} files ({1} records)\n".format(merged["Files"], merged["Records"]))
+        print("Hours Per Task:")
+        for name, hours in sorted(merged["Tasks"].items(), key=lambda item: -item[1]):
+            print('    "{0}" = {1:.2f} Hrs.'.format(name, hours))
+        print("\nHours Per Week:")
+        for week, hours in sorted(merged["Weeks"].items()):
+            print("    {0} = {1:.2f} Hrs.".format(Task.epoch_to_date_time(week).date(), hours))
+        print("\nHours Per Weekday And Hour:")
+        print("    " + " " * 10 + "".join("{0:>5}".format(h) for h in range(PunchCardGrapher.HOURS_IN_DAY)))
+        for d, day in enumerate(PunchCardGrapher.DAYS):
+            row = merged["Grid"][d * PunchCardGrapher.HOURS_IN_DAY:(d + 1) * PunchCardGrapher.HOURS_IN_DAY]
+            print("    {0:<10}".format(day) + "".join("{0:>5.0f}".format(minutes / 60) for minutes in row))
+        print()
+        if len(args) == 3:
+            try:
+                PunchCardGrapher([], headless=True, timeGrid=merged["Grid"]).save(args[2])
+            except Exception as e:
+                print("Export Error: " + str(e))
+
+    def handleConvertArg(self, args):
+        if len(args) != 2:
+            print("Argument Error: Convert needs a source and a destination file!")
+            print(HELP_DOC)
+            return
+        source, destination = args
+        try:
+            sourceClass = TaskStore.classFor(source)
+            destinationClass = TaskStore.classFor(destination)
+            if sourceClass is destinationClass:
+                raise Exception("Argument Error: '{0}' and '{1}' are already the same format!".format(source, destination))
+            if not os.path.exists(source):
+                raise Exception("IO Error: '{0}' doesn't exist!".format(source))
+            with sourceClass(source) as store:
+                destinationClass.write(destination, store.taskRecords(), store.generation())
+        except Exception as e:
+            print("Conversion Error: " + str(e))
+
+    def handleListArg(self, args):
+        first = args[0].lower()
+        if first == "tasks":
+            print("Tasks:\n")
+            for t in self.taskNames():
+                print('    "' + t + '"')
+            print()
+            return
+        elif first == "task":
+            if len(args) == 2:
+                if self.get(args[1]) is not None:
+                    print("Listing '{0}'\n".format(args[1]))
+                    for t in self.get(args[1]):
+                        for l in str(t).split('\n'):
+                            print("    " + l)
+                        print()
+                    return
+                self.fail("Argument Error: The task '{0}' doesn't exist!".format(args[1]))
+                return
+        self.fail("Argument Error: No argument given to list!", True)
+
+    def handlePunchArg(self, args):
+        if len(args) in (2, 3):
+            punchTime = None
+            if len(args) == 3:
+                try:
+                    punchTime = Task.date_time_string_to_date_time(args[2])
+                except ValueError:
+                    print("Argument Error: '{0}' isn't a time like 2009-05-13T19:19:30!".format(args[2]))
+                    return
+            if args[0][0].lower() == "i":
+                try:
+                    self.punchIn(args[1], punchTime)
+                except Exception as e:
+                    print("Error Punching in: " + str(e))
+            elif args[0][0].lower() == "o":
+                try:
+                    task = self.punchOut(args[1], punchTime)
+                    print("Task Duration = {0} Hrs.".format(task.get_duration_in_hours()))
+                except Exception as e:
+                    print("Error Punching out: " + str(e))
+            else:
+                print("Argument Error: Didn't specify to print in or out!")
+                print(HELP_DOC)
+        else:
+            print("Argument Error: No argument given to punch in or out of!")
+            print(HELP_DOC)
+
+    def getTaskSummary(self, taskName):
+        stats = self.getStats(taskName)
+        if stats is None:
+            raise Exception("Argument Error: The task '{0}' doesn't exist!".format(taskName))
+        now = datetime.now()
+        weekStart = Task.date_time_to_epoch(TaskManager.midnight(self.getCurrentWeekStart()))
+        hoursThisWeek = Task.seconds_to_hours(stats.worked_seconds(weekStart, weekStart + 7 * TaskStats.SECONDS_IN_DAY, Task.date_time_to_epoch(now)))
+        taskCount = stats.Count + len(stats.Open)
+        retString = str(taskCount) + " Total Sub-Tasks\n"
+        retString += "    {0} Finished\n".format(stats.Count)
+        if len(stats.Open) > 0:
+            retString += "    {0} Running\n".format(len(stats.Open))
+        for i in range(len(stats.Open)):
+            started = Task.epoch_to_date_time(stats.Open[i])
+            retString += "        Running Sub-Task #{0}\n".format(i + 1)
+            retString += "            Started: {0}\n".format(started)
+            retString += "            Duration: {0} Hrs.\n".format(Task.seconds_to_hours((now - started).total_seconds()))
+        if stats.Count > 0:
+            retString += "Average Duration = {0} Hrs. (+/- {1})\n".format(Task.seconds_to_hours(stats.Mean), Task.seconds_to_hours(stats.get_std_dev()))
+            for label, timeOfDay in (("Start", stats.get_mean_start_time()), ("End", stats.get_mean_end_time())):
+                if timeOfDay is not None:
+                    retString += "Average {0} Time = {1:02}:{2:02}\n".format(label, timeOfDay // 3600, timeOfDay // 60 % 60)
+        retString += "Hours Spent This Week = {0}\n".format(hoursThisWeek)
+        retString += "Total Duration = {0}(s)".format(stats.Total)
+        return retString
+
+    def handlePrintArg(self, args):
+        if len(args) >= 1 and args[0].lower() == "summary":
+            if len(args) == 1:
+                for key in self.taskNames():
+                    print("Summary of task '{0}'".format(key))
+                    print(self.getTaskSummary(key))
+                    print()
+            elif len(args) == 2:
+                try:
+                    tSummary = self.getTaskSummary(args[1])
+                    print("Summary of task '{0}'".format(args[1]))
+                    print(tSummary)
+                    print()
+                except Exception as e:
+                    self.fail(str(e))
+            else:
+                self.fail("Argument Error: Too many arguments given while printing summaries!")
+
+    def handleDisplayArg(self, args):
+        if len(args) >= 1 and args[0].lower() == "tasks":
+            if len(args) == 1:
+                plt = PunchCardGrapher(list(self.allTasks()))
+                plt.show()
+            elif len(args) == 2:
+                taskList = self.get(args[1])
+                if taskList is None:
+                    self.fail("Argument Error: The task '{0}' doesn't exist!".format(args[1]), True)
+                    return
+                plt = PunchCardGrapher(taskList)
+                plt.show()
+            else:
+                self.fail("Argument Error: Too many arguments given while displaying tasks!", True)
+
+    def exportCards(self, directory, extension="png"):
+        '''Saves a punch card of every task into directory. Each card is keyed by
+        a hash of the weekday by hour grid it shows: a file that already holds
+        that card is left alone, a card in CARD_CACHE_DIR is copied, and only the
+        rest are rendered, spread over a process pool. Tasks with the same grid
+        share one render.
+        '''
+        import shutil
+        from concurrent.futures import ProcessPoolExecutor
+        os.makedirs(directory, exist_ok=True)
+        os.makedirs(CARD_CACHE_DIR, exist_ok=True)
+        manifestPath = os.path.join(directory, CARD_MANIFEST)
+        try:
+            with open(manifestPath, 'r') as inF:
+                manifest = json.load(inF)
+        except (OSError, ValueError):
+            manifest = {}
+        cards = [] # [ (TaskName, card path, card key, whether the card path already holds it) ]
+        renders = {} # { cached card path: grid } of the cards nothing has rendered yet
+        for taskName in self.taskNames():
+            grid = Profiler.timed("graph", PunchCardGrapher.convertTasksToTimeGrid, self.get(taskName))
+            key = PunchCardGrapher.cardKey(grid, extension)
+            cardPath = os.path.join(directory, TaskManager.safeFileName(taskName) + "." + extension)
+            cachePath = os.path.join(CARD_CACHE_DIR, key + "." + extension)
+            upToDate = manifest.get(os.path.basename(cardPath)) == key and os.path.exists(cardPath)
+            cards.append((taskName, cardPath, key, upToDate))
+            if not upToDate and not os.path.exists(cachePath):
+                renders[cachePath] = grid
+        failed = {}
+        if len(renders) > 0:
+            with ProcessPoolExecutor() as pool:
+                futures = {cachePath: pool.submit(PunchCardGrapher.renderCard, grid, cachePath) for cachePath, grid in renders.items()}
+                for cachePath, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed[cachePath] = e
+        Profiler.count("cards rendered", len(renders) - len(failed))
+        unchanged = copied = 0
+        for taskName, cardPath, key, upToDate in cards:
+            fileName = os.path.basename(cardPath)
+            cachePath = os.path.join(CARD_CACHE_DIR, key + "." + extension)
+            try:
+                if upToDate:
+                    unchanged += 1
+                else:
+                    if cachePath in failed:
+                        raise failed[cachePath]
+                    manifest.pop(fileName, None) # Forgotten until it's been replaced
+                    shutil.copyfile(cachePath, cardPath)
+                    manifest[fileName] = key
+                    copied += 1
+                if os.path.exists(cachePath):
+                    os.utime(cachePath) # Used, it's evicted after the ones that weren't
+            except Exception as e:
+                print("Export Error: Saving the card of '{0}' failed: {1}".format(taskName, e))
+        tmpPath = manifestPath + ".tmp"
+        with open(tmpPath, 'w') as outF:
+            json.dump(manifest, outF)
+        os.replace(tmpPath, manifestPath)
+        TaskManager.evictCards(CARD_CACHE_DIR, CARD_CACHE_BYTES)
+        rendered = len(renders) - len(failed)
+        print("Exported {0} punch cards to '{1}' ({2} rendered, {3} from the cache, {4} unchanged)".format(len(cards), directory, rendered, copied - rendered, unchanged))
+
+    @staticmethod
+    def evictCards(cacheDir, maxBytes):
+        # Least recently used first, until what's left fits in maxBytes
+        cached = []
+        for f in os.listdir(cacheDir):
+            path = os.path.join(cacheDir, f)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue # Evicted by another export meanwhile
+            cached.append((info.st_mtime_ns, info.st_size, path))
+        total = sum(size for _, size, _ in cached)
+        for _, size, path in sorted(cached):
+            if total <= maxBytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def handleExportRecordsArg(self, args):
+        # Export Records (csv|ndjson) (Optional)[File|-] streamed out of the save file, run before anything is loaded
+        try:
+            rest = []
+            taskName = state = None
+            i = 0
+            while i < len(args):
+                option = args[i].lower()
+                if option in ("--task", "--state"):
+                    if i + 1 == len(args):
+                        raise Exception("Argument Error: {0} needs a value!".format(option))
+                    if option == "--task":
+                        taskName = args[i + 1]
+                    else:
+                        state = args[i + 1].lower()
+                        if state not in ("open", "closed"):
+                            raise Exception("Argument Error: --state takes open or closed!")
+                    i += 2
+                else:
+                    rest.append(args[i])
+                    i += 1
+            rest, since, until, by = TaskManager.parseRangeOptions(rest)
+            if by is not None:
+                raise Exception("Argument Error: Records aren't totaled, --by doesn't apply!")
+            if len(rest) not in (1, 2) or rest[0].lower() not in ("csv", "ndjson"):
+                raise Exception("Argument Error: Exporting records needs csv or ndjson and optionally an output file!")
+        except Exception as e:
+            print(e)
+            print(HELP_DOC)
+            return
+        fmt = rest[0].lower()
+        path = rest[1] if len(rest) == 2 else "-"
+        errorList = []
+        records = self.streamRecords(SAVE_FILE, JOURNAL_DIR, taskName, TaskManager.optionalEpoch(since), TaskManager.optionalEpoch(until), state, errorList)
+        from contextlib import redirect_stdout
+        out = sys.stdout
+        # With the records on stdout, anything printed along the way goes to stderr instead
+        with redirect_stdout(sys.stderr if path == "-" else out):
+            try:
+                if path == "-":
+                    TaskManager.writeRecords(records, out, fmt)
+                else:
+                    tmpPath = path + ".tmp"
+                    with open(tmpPath, 'w', newline="", encoding="utf-8") as outF:
+                        count = TaskManager.writeRecords(records, outF, fmt)
+                    os.replace(tmpPath, path)
+                    print("Exported {0} records to '{1}'".format(count, path))
+            except BrokenPipeError:
+                # Whatever read stdout stopped early (head and the like), exit quietly
+                os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+            except Exception as e:
+                print("Export Error: " + str(e))
+            for x in errorList:
+                print(x)
+
+    def handleExportArg(self, args):
+        if len(args) >= 1 and args[0].lower() == "records":
+            # Reads the files rather than what's loaded, see run
+            self.fail("Argument Error: Export Records can't be run from a batch or the daemon!")
+            return
+        if len(args) >= 1 and args[0].lower() == "all":
+            if len(args) not in (2, 3) or (len(args) == 3 and args[2].lower() not in ("png", "svg")):
+                self.fail("Argument Error: Exporting every task needs a directory and optionally png or svg!", True)
+                return
+            try:
+                self.exportCards(args[1], args[2].lower() if len(args) == 3 else "png")
+            except Exception as e:
+                self.fail("Export Error: " + str(e))
+            return
+        if len(args) >= 1 and args[0].lower() == "tasks":
+            if len(args) != 2:
+                self.fail("Argument Error: Exporting all tasks needs exactly one output file!", True)
+                return
+            taskList = list(self.allTasks())
+            path = args[1]
+        elif len(args) >= 1 and args[0].lower() == "task":
+            if len(args) != 3:
+                self.fail("Argument Error: Exporting a task needs a task name and an output file!", True)
+                return
+            taskList = self.get(args[1])
+            if taskList is None:
+                self.fail("Argument Error: The task '{0}' doesn't exist!".format(args[1]), True)
+                return
+            path = args[2]
+        else:
+            self.fail("Argument Error: Didn't specify what to export!", True)
+            return
+        try:
+            grapher = Profiler.timed("graph", PunchCardGrapher, taskList, True, True)
+            Profiler.timed("render", grapher.save, path)
+        except Exception as e:
+            self.fail("Export Error: " + str(e))
+
+    @staticmethod
+    def parseRangeOptions(args):
+        '''Splits --from, --to and --by off of args. Returns the rest of args,
+        the midnights the range starts and ends at (None for open ended) and
+        the bucket to total by, None, "week" or "month". --to is inclusive.
+        '''
+        rest = []
+        since = until = by = None
+        i = 0
+        while i < len(args):
+            option = args[i].lower()
+            if option in ("--from", "--to", "--by"):
+                if i + 1 == len(args):
+                    raise Exception("Argument Error: {0} needs a value!".format(option))
+                value = args[i + 1]
+                if option == "--by":
+                    by = value.lower()
+                    if by not in ("week", "month"):
+                        raise Exception("Argument Error: --by takes week or month!")
+                else:
+                    try:
+                        day = datetime.strptime(value, "%Y-%m-%d")
+                    except ValueError:
+                        raise Exception("Argument Error: '{0}' isn't a date like 2009-05-13!".format(value))
+                    if option == "--from":
+                        since = day
+                    else:
+                        until = day + timedelta(days=1)
+                i += 2
+            else:
+                rest.append(args[i])
+                i += 1
+        if since is not None and until is not None and until <= since:
+            raise Exception("Argument Error: --to can't be before --from!")
+        return rest, since, until, by
+
+    @staticmethod
+    def rangeBuckets(since, until, by):
+        '''Yields (label, start, end) for each week or month in [since, until),
+        the first and last are cut down to the range.
+        '''
+        if by == "week":
+            bucket = since - timedelta(days=since.weekday())
+        else:
+            bucket = datetime(since.year, since.month, 1)
+        while bucket < until:
+            if by == "week":
+                label = "Week of " + bucket.strftime("%Y-%m-%d")
+                nextBucket = bucket + timedelta(days=7)
+            else:
+                label = bucket.strftime("%Y-%m")
+                nextBucket = datetime(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+            yield label, max(bucket, since), min(nextBucket, until)
+            bucket = nextBucket
+
+    def handleCalcRangeArg(self, args, pay):
+        # Calc Hours [TaskName] and Calc Pay [TaskName] [HourlyWage] (Optional)[IncomeTax] with --from/--to/--by
+        try:
+            args, since, until, by = TaskManager.parseRangeOptions(args)
+            if len(args) not in ((2, 3) if pay else (1,)):
+                raise Exception("Argument Error: Calc {0} takes a task name{1}!".format("Pay" if pay else "Hours", ", an hourly wage and optionally an income tax" if pay else ""))
+            taskName = args[0]
+            if not self.inStore(taskName) and self.getStats(taskName) is None:
+                raise Exception("Argument Error: The task '{0}' doesn't exist!".format(taskName))
+            rate = 1.0
+            if pay:
+                hourlyPay = float(args[1])
+                incomeTax = float(args[2]) if len(args) == 3 else 0
+                if hourlyPay < 0 or incomeTax < 0 or incomeTax > 1:
+                    raise Exception("Argument Error: Hourly pay must be positive and income tax must be between 1 and 0!")
+                rate = hourlyPay * (1 - incomeTax)
+            now = datetime.now()
+            amount = lambda fromDay, toDay: Task.seconds_to_hours(self.calculateSecondsWorked(taskName, fromDay, toDay, now)) * rate
+            unit = "$" if pay else " Hrs."
+            print("{0} '{1}'".format("Pay for" if pay else "Hours worked on", taskName))
+            if by is not None:
+                fromDay = since or self.firstWorkedDay(taskName)
+                toDay = until or TaskManager.midnight(now) + timedelta(days=1)
+                if fromDay is not None:
+                    for label, bucketStart, bucketEnd in TaskManager.rangeBuckets(fromDay, toDay, by):
+                        bucketAmount = amount(bucketStart, bucketEnd)
+                        if bucketAmount > 0: # Weeks and months without work are left out
+                            print("    {0:<20} {1:.2f}{2}".format(label, bucketAmount, unit))
+            print("Total = {0:.2f}{1}".format(amount(since, until), unit))
+        except Exception as e:
+            self.fail("Calculation Error: " + str(e))
+
+    def handleCalcArg(self, args):
+        if len(args) >= 1 and args[0].lower() in ("hours", "pay"):
+            self.handleCalcRangeArg(args[1:], args[0].lower() == "pay")
+            return
+        if len(args) >= 4:
+            incomeTax = 0
+            if len(args) > 5:
+                self.fail("Argument Error: Too many arguments given while calculating average pay!", True)
+                return
+            elif len(args) == 5:
+                try:
+                    incomeTax = float(args[4])
+                except Exception:
+                    pass
+            try:
+                if self.get(args[2]) is None:
+                    raise Exception("Argument Error: The task '{0}' doesn't exist!".format(args[2]))
+                hourlyPay = float(args[3])
+                if hourlyPay < 0 or incomeTax < 0 or incomeTax > 1:
+                    raise Exception("Argument Error: Hourly pay must be positive and income tax must be between 1 and 0!")
+                print("Your average pay is {0:00}$".format(self.calculateTaskPay(args[2], hourlyPay, incomeTax)))
+            except Exception as e:
+                self.fail("Calculation Error: " + str(e), True)
+        else:
+            self.fail("Argument Error: Not enough arguments given to calculate average pay", True)
+
+def main():
+    global HELP_DOC, PROFILER
+    tm = TaskManager()
+    HELP_DOC = HELP_DOC.format(sys.argv[0]) # Inject file name into help documentation
+    args = sys.argv[1:]
+    options = os.environ.get("PUNCHCARD_PROFILE")
+    for arg in list(args):
+        if arg == "--profile" or arg.startswith("--profile="):
+            args.remove(arg)
+            options = arg.partition("=")[2] or "text"
+    if not options:
+        tm.run(args) # feed arguments to task manager to run
+        return
+    try:
+        PROFILER = Profiler(options)
+    except Exception as e:
+        print(e)
+        return
+    PROFILER.run(lambda: tm.run(args), args)
+
+if __name__ == "__main__":
+    main()
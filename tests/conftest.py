@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import PyPunchCardCore
+
+
+@pytest.fixture
+def punchcard(tmp_path, monkeypatch):
+    # Every test gets its own save file, journals and socket in an empty directory
+    monkeypatch.chdir(tmp_path)
+    for setting in ("SAVE_FILE", "JOURNAL_DIR", "SOCKET_FILE", "STORE_RETRIES"):
+        monkeypatch.setattr(PyPunchCardCore, setting, getattr(PyPunchCardCore, setting))
+    return PyPunchCardCore
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+
+import pytest
+
+PUNCHES = [("2024-02-26T09:00:00", "2024-02-26T12:00:00"), # Monday
+           ("2024-02-29T23:00:00", "2024-03-01T01:00:00"), # Into the next month
+           ("2024-03-10T23:00:00", "2024-03-11T02:00:00"), # Sunday into the next week
+           ("2024-03-25T10:00:00", "2024-03-25T14:00:00")] # After a week without work
+
+
+@pytest.fixture(params=["TASK_MEMORY.json", "TASK_MEMORY.sqlite"])
+def punched(request, punchcard, monkeypatch, capsys):
+    monkeypatch.setattr(punchcard, "SAVE_FILE", request.param)
+    for start, end in PUNCHES:
+        punchcard.TaskManager().run(["Punch", "in", "A", start])
+        punchcard.TaskManager().run(["Punch", "out", "A", end])
+    capsys.readouterr()
+    return punchcard
+
+
+def calc(punchcard, capsys, *args):
+    punchcard.TaskManager().run(["Calc"] + list(args))
+    return capsys.readouterr().out.splitlines()
+
+
+def test_calc_hours_by_week(punched, capsys):
+    assert calc(punched, capsys, "Hours", "A", "--by", "week") == ["Hours worked on 'A'",
+                                                                  "    Week of 2024-02-26   5.00 Hrs.",
+                                                                  "    Week of 2024-03-04   1.00 Hrs.",
+                                                                  "    Week of 2024-03-11   2.00 Hrs.",
+                                                                  "    Week of 2024-03-25   4.00 Hrs.",
+                                                                  "Total = 12.00 Hrs."]
+
+
+def test_calc_hours_by_week_cuts_the_range(punched, capsys):
+    assert calc(punched, capsys, "Hours", "A", "--from", "2024-03-01", "--to", "2024-03-10", "--by", "week") == \
+        ["Hours worked on 'A'", "    Week of 2024-02-26   1.00 Hrs.", "    Week of 2024-03-04   1.00 Hrs.", "Total = 2.00 Hrs."]
+
+
+def test_calc_pay_by_month(punched, capsys):
+    assert calc(punched, capsys, "Pay", "A", "10", "0.5", "--by", "month") == ["Pay for 'A'",
+                                                                              "    2024-02              20.00$",
+                                                                              "    2024-03              40.00$",
+                                                                              "Total = 60.00$"]
+
+
+def test_calc_hours_by_something_else(punched, capsys):
+    assert calc(punched, capsys, "Hours", "A", "--by", "day") == ["Calculation Error: Argument Error: --by takes week or month!"]
+
+
+@pytest.fixture(params=["TASK_MEMORY.json", "TASK_MEMORY.ppcb", "TASK_MEMORY.sqlite"])
+def exported(request, punchcard, monkeypatch, capsys):
+    monkeypatch.setattr(punchcard, "SAVE_FILE", request.param)
+    for args in (["Punch", "in", "A", "2024-02-28T09:00:00"], ["Punch", "out", "A", "2024-02-28T17:00:00"],
+                 ["Punch", "in", 'B, "quoted" \u00e9', "2024-02-29T22:00:00"], ["Punch", "out", 'B, "quoted" \u00e9', "2024-03-01T02:00:00"],
+                 ["Punch", "in", "A", "2024-02-29T09:00:00"], ["Compact"],
+                 # Still in the journals when exported
+                 ["Punch", "out", "A", "2024-03-01T12:00:00"], ["Punch", "in", "C", "2024-03-02T08:00:00"]):
+        punchcard.TaskManager().run(args)
+    capsys.readouterr()
+    return punchcard
+
+
+def test_export_records_csv(exported, capsys):
+    exported.TaskManager().run(["Export", "Records", "csv", "records.csv"])
+    assert capsys.readouterr().out == "Exported 4 records to 'records.csv'\n"
+    with open("records.csv", newline="", encoding="utf-8") as inF:
+        rows = list(csv.reader(inF))
+    assert rows[0] == ["TaskName", "TaskStart", "TaskEnd"]
+    assert sorted(rows[1:]) == [["A", "2024-02-28T09:00:00", "2024-02-28T17:00:00"], ["A", "2024-02-29T09:00:00", "2024-03-01T12:00:00"],
+                                ['B, "quoted" \u00e9', "2024-02-29T22:00:00", "2024-03-01T02:00:00"], ["C", "2024-03-02T08:00:00", ""]]
+
+
+def test_export_records_ndjson_filters(exported, capsys):
+    def export(*options):
+        exported.TaskManager().run(["Export", "Records", "ndjson"] + list(options))
+        return sorted((r["TaskName"], r["TaskStart"], r["TaskEnd"]) for r in map(json.loads, capsys.readouterr().out.splitlines()))
+
+    assert export("--task", "A") == [("A", "2024-02-28T09:00:00", "2024-02-28T17:00:00"), ("A", "2024-02-29T09:00:00", "2024-03-01T12:00:00")]
+    assert export("--state", "open") == [("C", "2024-03-02T08:00:00", None)]
+    # Records count by when they started, one punched out of later in a journal included
+    assert export("--from", "2024-02-29", "--to", "2024-03-01", "--state", "closed", "-") == \
+        [("A", "2024-02-29T09:00:00", "2024-03-01T12:00:00"), ('B, "quoted" \u00e9', "2024-02-29T22:00:00", "2024-03-01T02:00:00")]
+    assert export("--task", "Nope") == []
+
+
+def test_export_records_rejects_bad_options(exported, capsys):
+    for options, message in ((["xml"], "needs csv or ndjson"), (["csv", "--state", "done"], "--state takes open or closed"),
+                             (["csv", "--by", "week"], "--by doesn't apply")):
+        exported.TaskManager().run(["Export", "Records"] + options)
+        assert message in capsys.readouterr().out
+
+
+def test_write_records_is_the_same_in_any_chunks(punchcard):
+    records = [("A", 1709280000 + i * 5000, None if i % 7 == 0 else 1709280000 + i * 5000 + 3600) for i in range(100)]
+    outputs = []
+    for fmt in ("csv", "ndjson"):
+        for chunkSize in (1, 3, 4096):
+            outF = io.StringIO()
+            assert punchcard.TaskManager.writeRecords(iter(records), outF, fmt, chunkSize) == len(records)
+            outputs.append(outF.getvalue())
+        assert outputs[-3] == outputs[-2] == outputs[-1]
+    assert [json.loads(line)["TaskEnd"] for line in outputs[-1].splitlines()][:2] == [None, "2024-03-01T10:23:20"]
@@ -0,0 +1,59 @@
+import random
+from datetime import timedelta
+
+import pytest
+
+
+def bruteForceGrid(punchcard, intervals, weightByMinutes):
+    # Walks every interval an hour at a time through datetime, nothing shared with the binning
+    grid = [[0.0] * 24 for _ in range(7)]
+    for start, end in intervals:
+        if end < start:
+            continue
+        t = punchcard.Task.epoch_to_date_time(start)
+        last = punchcard.Task.epoch_to_date_time(max(end - 1, start))
+        while True:
+            hourStart = t.replace(minute=0, second=0)
+            hourEnd = hourStart + timedelta(hours=1)
+            if weightByMinutes:
+                stop = min(hourEnd, punchcard.Task.epoch_to_date_time(end))
+                grid[t.weekday()][t.hour] += (stop - t).total_seconds() / 60.0
+            else:
+                grid[t.weekday()][t.hour] += 1
+            if hourEnd > last:
+                break
+            t = hourEnd
+    return grid
+
+
+def epoch(punchcard, text):
+    return punchcard.Task.date_time_to_epoch(punchcard.Task.date_time_string_to_date_time(text))
+
+
+def test_binning_matches_counting_hour_by_hour(punchcard):
+    np = pytest.importorskip("numpy")
+    rng = random.Random(1234)
+    intervals = [(epoch(punchcard, "2024-03-03T23:30:00"), epoch(punchcard, "2024-03-04T00:15:00")), # Sunday into Monday
+                 (epoch(punchcard, "2024-03-01T22:59:59"), epoch(punchcard, "2024-03-02T01:00:01")), # Across midnight and three hours
+                 (epoch(punchcard, "2024-03-01T10:00:00"), epoch(punchcard, "2024-03-01T10:00:00")), # Zero length
+                 (epoch(punchcard, "2024-03-01T10:00:00"), epoch(punchcard, "2024-03-01T11:00:00")), # Exactly one hour
+                 (epoch(punchcard, "2024-03-01T10:20:00"), epoch(punchcard, "2024-03-16T09:10:00")), # Over two weeks
+                 (epoch(punchcard, "2024-03-01T12:00:00"), epoch(punchcard, "2024-03-01T11:00:00"))] # Ends before it starts
+    base = epoch(punchcard, "2015-01-01T00:00:00")
+    for _ in range(300):
+        start = base + rng.randrange(10 * 365 * 86400)
+        intervals.append((start, start + rng.choice([rng.randrange(3 * 3600), rng.randrange(2 * 86400), rng.randrange(9 * 86400)])))
+    starts = [start for start, _ in intervals]
+    ends = [end for _, end in intervals]
+    for weightByMinutes in (True, False):
+        grid = punchcard.PunchCardGrapher.binEpochsToTimeGrid(starts, ends, weightByMinutes)
+        assert grid.shape == (7, 24)
+        assert np.allclose(grid, bruteForceGrid(punchcard, intervals, weightByMinutes))
+
+
+def test_time_data_leaves_out_running_records(punchcard):
+    pytest.importorskip("numpy")
+    history = punchcard.TaskHistory("A")
+    history.add(epoch(punchcard, "2024-03-04T23:30:00"), epoch(punchcard, "2024-03-05T00:30:00")) # Monday into Tuesday
+    history.add(epoch(punchcard, "2024-03-06T09:00:00"))
+    assert punchcard.PunchCardGrapher.convertTasksToTimeData(history) == {(0, 23): 30.0, (1, 0): 30.0}
@@ -0,0 +1,227 @@
+import json
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+from conftest import ROOT
+
+
+def records(punchcard):
+    # { TaskName: [ (start epoch, end epoch or None) ] } as a fresh process would load them
+    tm = punchcard.TaskManager()
+    tm.loadSaveFile()
+    return tm.toEpochRecords()
+
+
+def epoch(punchcard, text):
+    return punchcard.Task.date_time_to_epoch(punchcard.Task.date_time_string_to_date_time(text))
+
+
+def test_replay_after_compact_crash_keeps_records_once(punchcard):
+    for args in (["Punch", "in", "A", "2024-03-01T08:00:00"], ["Punch", "out", "A", "2024-03-01T12:00:00"],
+                 ["Punch", "in", "B", "2024-03-01T09:00:00"]):
+        punchcard.TaskManager().run(args)
+    journals = {}
+    for name in os.listdir(punchcard.JOURNAL_DIR):
+        if not name.endswith(".journal"):
+            continue
+        with open(os.path.join(punchcard.JOURNAL_DIR, name), 'rb') as inF:
+            journals[name] = inF.read()
+    punchcard.TaskManager().run(["Compact"])
+    # A crash between writing the save file and removing the journals leaves both behind
+    for name, data in journals.items():
+        with open(os.path.join(punchcard.JOURNAL_DIR, name), 'wb') as outF:
+            outF.write(data)
+    expected = {"A": [(epoch(punchcard, "2024-03-01T08:00:00"), epoch(punchcard, "2024-03-01T12:00:00"))],
+                "B": [(epoch(punchcard, "2024-03-01T09:00:00"), None)]}
+    assert records(punchcard) == expected
+    punchcard.TaskManager().run(["Punch", "out", "B", "2024-03-01T10:00:00"])
+    punchcard.TaskManager().run(["Compact"])
+    expected["B"] = [(epoch(punchcard, "2024-03-01T09:00:00"), epoch(punchcard, "2024-03-01T10:00:00"))]
+    assert records(punchcard) == expected
+    assert not any(os.path.exists(os.path.join(punchcard.JOURNAL_DIR, name)) for name in journals)
+
+
+def test_compact_opens_one_journal_at_a_time(punchcard, monkeypatch):
+    resource = pytest.importorskip("resource")
+    os.makedirs(punchcard.JOURNAL_DIR)
+    for i in range(300):
+        with open(punchcard.TaskManager.journalFile(punchcard.JOURNAL_DIR, "T{0}".format(i)), 'w') as outF:
+            outF.write(json.dumps({"Event": "in", "TaskName": "T{0}".format(i), "Time": "2024-03-01T08:00:00"}) + "\n")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (128, hard))
+    try:
+        punchcard.TaskManager().run(["Compact"])
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert len(records(punchcard)) == 300
+    assert punchcard.TaskManager.journalTaskNames(punchcard.JOURNAL_DIR) == []
+
+
+def test_punches_catch_up_with_other_managers(punchcard):
+    first, second = punchcard.TaskManager(), punchcard.TaskManager()
+    first.loadSaveFile()
+    second.loadSaveFile()
+    first.punchIn("X")
+    second.punchIn("Y") # Other tasks never get in each other's way
+    with pytest.raises(Exception, match="must be punched out"):
+        second.punchIn("X")
+    assert sorted(records(punchcard)) == ["X", "Y"]
+
+
+def test_concurrent_punch_ins_of_a_task_let_one_through(punchcard, tmp_path):
+    script = os.path.join(ROOT, "PyPunchCard.py")
+    processes = [subprocess.Popen([sys.executable, script, "Punch", "in", "X", "2024-03-01T08:00:{0:02}".format(i)],
+                                  cwd=tmp_path, stdout=subprocess.PIPE, text=True) for i in range(8)]
+    outputs = [p.communicate()[0] for p in processes]
+    assert sum("must be punched out" in output for output in outputs) == 7
+    with open(punchcard.TaskManager.journalFile(punchcard.JOURNAL_DIR, "X"), 'r') as inF:
+        assert [json.loads(line)["Event"] for line in inF] == ["in"]
+    assert len(records(punchcard)["X"]) == 1
+
+
+def test_store_retries_when_the_save_file_changed(punchcard, monkeypatch):
+    monkeypatch.setattr(punchcard, "JOURNAL_DIR", None)
+    storeIfUnchanged = punchcard.TaskManager.storeIfUnchanged
+    attempts = []
+
+    def racedStore(self, storePath):
+        # Another process punches between this one loading and storing, once
+        attempts.append(storePath)
+        if len(attempts) == 1:
+            punchcard.TaskManager().run(["Punch", "in", "B", "2024-03-01T09:00:00"])
+        return storeIfUnchanged(self, storePath)
+
+    monkeypatch.setattr(punchcard.TaskManager, "storeIfUnchanged", racedStore)
+    punchcard.TaskManager().run(["Punch", "in", "A", "2024-03-01T08:00:00"])
+    assert len(attempts) == 3 # The raced one, the other process' own and the retry
+    assert sorted(records(punchcard)) == ["A", "B"]
+
+
+def test_store_gives_up_when_the_save_file_keeps_changing(punchcard, monkeypatch, capsys):
+    monkeypatch.setattr(punchcard, "JOURNAL_DIR", None)
+    monkeypatch.setattr(punchcard.TaskManager, "storeIfUnchanged", lambda self, storePath: False)
+    punchcard.TaskManager().run(["Punch", "in", "A"])
+    assert "gave up after {0} tries".format(punchcard.STORE_RETRIES) in capsys.readouterr().out
+    assert not os.path.exists(punchcard.SAVE_FILE)
+
+
+def test_compact_without_journals_keeps_other_punches(punchcard, monkeypatch):
+    monkeypatch.setattr(punchcard, "JOURNAL_DIR", None)
+    punchcard.TaskManager().run(["Punch", "in", "A", "2024-03-01T08:00:00"])
+    storeIfUnchanged = punchcard.TaskManager.storeIfUnchanged
+    attempts = []
+
+    def racedStore(self, storePath):
+        attempts.append(storePath)
+        if len(attempts) == 1:
+            punchcard.TaskManager().run(["Punch", "in", "B", "2024-03-01T09:00:00"])
+        return storeIfUnchanged(self, storePath)
+
+    monkeypatch.setattr(punchcard.TaskManager, "storeIfUnchanged", racedStore)
+    punchcard.TaskManager().run(["Compact"])
+    assert len(attempts) == 3
+    assert sorted(records(punchcard)) == ["A", "B"]
+
+
+def test_single_task_commands_without_journals(punchcard, monkeypatch, capsys):
+    monkeypatch.setattr(punchcard, "JOURNAL_DIR", None)
+    punchcard.TaskManager().run(["Punch", "in", "A", "2024-03-01T08:00:00"])
+    for args in (["List", "Task", "A"], ["Print", "Summary", "A"], ["Calc", "Hours", "A"]):
+        punchcard.TaskManager().run(args)
+    output = capsys.readouterr().out
+    assert "Warning" not in output
+    assert "2024-03-01T08:00:00" in output
+
+
+def test_punches_matching_saved_records_are_kept(punchcard, capsys):
+    for args in (["Punch", "in", "Y", "2026-01-01T09:00:00"], ["Punch", "out", "Y", "2026-01-01T10:00:00"], ["Compact"],
+                 ["Punch", "in", "Y", "2026-01-01T09:00:00"], ["Punch", "out", "Y", "2026-01-01T10:00:00"]):
+        punchcard.TaskManager().run(args)
+    assert "Error" not in capsys.readouterr().out
+    once = (epoch(punchcard, "2026-01-01T09:00:00"), epoch(punchcard, "2026-01-01T10:00:00"))
+    assert records(punchcard)["Y"] == [once, once]
+    punchcard.TaskManager().run(["Compact"])
+    assert records(punchcard)["Y"] == [once, once]
+
+
+def test_punches_after_another_process_compacts_go_to_the_new_generation(punchcard):
+    tm = punchcard.TaskManager()
+    tm.loadSaveFile()
+    tm.punchIn("A", punchcard.Task.date_time_string_to_date_time("2024-03-01T08:00:00"))
+    punchcard.TaskManager().run(["Compact"])
+    tm.punchOut("A", punchcard.Task.date_time_string_to_date_time("2024-03-01T09:00:00"))
+    assert tm.Generation == 1
+    assert records(punchcard) == {"A": [(epoch(punchcard, "2024-03-01T08:00:00"), epoch(punchcard, "2024-03-01T09:00:00"))]}
+
+
+def test_punches_check_the_stats_without_decoding_records(punchcard, monkeypatch, capsys):
+    for args in (["Punch", "in", "A", "2024-03-01T08:00:00"], ["Punch", "out", "A", "2024-03-01T09:00:00"],
+                 ["Punch", "in", "B", "2024-03-01T08:00:00"], ["Compact"]):
+        punchcard.TaskManager().run(args)
+    capsys.readouterr()
+
+    def decodePending(self, taskName):
+        raise AssertionError("Decoded the records of '{0}'".format(taskName))
+
+    with monkeypatch.context() as m:
+        m.setattr(punchcard.TaskManager, "decodePending", decodePending)
+        for args in (["Punch", "in", "A", "2024-03-02T08:00:00"], ["Punch", "in", "A", "2024-03-02T09:00:00"],
+                     ["Punch", "out", "A", "2024-03-02T10:00:00"], ["Punch", "out", "B", "2024-03-02T10:00:00"]):
+            punchcard.TaskManager().run(args)
+    output = capsys.readouterr().out
+    assert "must be punched out of before you can punch in" in output
+    assert "Decoded" not in output
+    assert records(punchcard) == {"A": [(epoch(punchcard, "2024-03-01T08:00:00"), epoch(punchcard, "2024-03-01T09:00:00")),
+                                        (epoch(punchcard, "2024-03-02T08:00:00"), epoch(punchcard, "2024-03-02T10:00:00"))],
+                                  "B": [(epoch(punchcard, "2024-03-01T08:00:00"), epoch(punchcard, "2024-03-02T10:00:00"))]}
+
+
+def test_locks_on_windows_wait_past_msvcrt_giving_up(punchcard, monkeypatch):
+    calls = []
+
+    def locking(fd, mode, nbytes):
+        calls.append((mode, os.lseek(fd, 0, os.SEEK_CUR), nbytes))
+        if len(calls) == 1:
+            raise OSError("Resource deadlock avoided") # What LK_LOCK raises after ten seconds
+
+    monkeypatch.setattr(punchcard.os, "name", "nt")
+    monkeypatch.setitem(sys.modules, "msvcrt", types.SimpleNamespace(LK_LOCK=1, LK_UNLCK=0, locking=locking))
+    lock = punchcard.TaskManager.openLocked("X.lock", shared=True)
+    punchcard.TaskManager.closeLocked(lock)
+    offset = punchcard.TaskManager.LockOffset
+    assert calls == [(1, offset, 1), (1, offset, 1), (0, offset, 1)]
+
+
+def test_batch_counts_failing_lines(punchcard, capsys):
+    punchcard.TaskManager().run(["Punch", "in", "A", "2024-03-01T08:00:00"])
+    capsys.readouterr()
+    tm = punchcard.TaskManager()
+    tm.loadSaveFile()
+    tm.JournalDir = punchcard.JOURNAL_DIR
+    tm.runBatch(["Punch out A 2024-03-01T09:00:00", "bogus", "List Task Nope", "List Tasks", "Print Summary Nope"])
+    output = capsys.readouterr().out
+    assert "Line 2: Argument Error: Unknown command 'bogus'!" in output
+    assert "Line 3: Argument Error: The task 'Nope' doesn't exist!" in output
+    assert "Line 5: Argument Error: The task 'Nope' doesn't exist!" in output
+    assert "Batch applied 2 of 5 commands" in output
+    assert "Punch (in|out|i|o)" not in output # No help in between
+
+
+def test_batch_of_many_tasks_holds_one_lock(punchcard, capsys):
+    resource = pytest.importorskip("resource")
+    lines = ["Punch in T{0} 2024-03-01T08:00:00".format(i) for i in range(300)] + ["Punch out Nope 2024-03-01T09:00:00"]
+    tm = punchcard.TaskManager()
+    tm.loadSaveFile()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (128, hard))
+    try:
+        tm.runBatch(lines)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert "Batch applied 300 of 301 commands" in capsys.readouterr().out
+    assert len(records(punchcard)) == 300
+    assert "Nope" not in punchcard.TaskManager.journalTaskNames(punchcard.JOURNAL_DIR) # Nothing left behind by the failed punch
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+
+def parse(punchcard, tmp_path, text, chunkSize):
+    path = tmp_path / "save.json"
+    path.write_text(text, encoding="utf-8")
+    return list(punchcard.TaskManager.iterJsonRecords(str(path), chunkSize))
+
+
+@pytest.mark.parametrize("text", ['[1.5]', '[1.5, -20e3, 7, true, null, "x}"]', '[ {"a": 1.25} ,\n 300 ]', '[]'])
+def test_values_split_at_every_offset(punchcard, tmp_path, text):
+    for chunkSize in range(1, len(text) + 2):
+        assert parse(punchcard, tmp_path, text, chunkSize) == json.loads(text), chunkSize
+
+
+def test_braces_in_task_names(punchcard, tmp_path):
+    records = [{"TaskName": name, "TaskStart": "2024-01-01T09:00:00", "TaskEnd": None}
+               for name in ("Fix {7}", "}{", "Ticket {12}", 'q\\"}', "plain")]
+    records.append({"TaskName": "nested", "Extra": [{"x": "}"}, 2.5]})
+    text = json.dumps(records)
+    for chunkSize in range(1, len(text) + 2):
+        assert parse(punchcard, tmp_path, text, chunkSize) == records, chunkSize
+
+
+def test_braces_in_task_names_stay_linear(punchcard, tmp_path, monkeypatch):
+    # A failed batch parse isn't tried again on the same chunk, so a chunk costs a few parses at most
+    records = [{"TaskName": "Ticket {%d}" % (i % 50), "TaskStart": "2024-01-01T09:00:00", "TaskEnd": "2024-01-01T10:00:00"} for i in range(4000)]
+    text = json.dumps(records)
+    loads = json.loads
+    calls = []
+    monkeypatch.setattr(json, "loads", lambda *args, **kwargs: calls.append(1) or loads(*args, **kwargs))
+    chunkSize = 16384
+    assert parse(punchcard, tmp_path, text, chunkSize) == records
+    assert len(calls) <= 2 * (len(text) // chunkSize + 1)
+
+
+@pytest.mark.parametrize("text, message", [('{"TaskName": "A"}', "isn't a list"), ('[{"TaskName": "A"}', "never closed"),
+                                           ('[{"TaskName": "A"} {"TaskName": "B"}]', "Expected ','"), ('[{"TaskName": "A"', "middle of an element")])
+def test_malformed_files(punchcard, tmp_path, text, message):
+    for chunkSize in (1, 7, 1 << 20):
+        with pytest.raises(Exception, match=message):
+            parse(punchcard, tmp_path, text, chunkSize)
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+
+import pytest
+
+
+def digest(path):
+    with open(path, 'rb') as inF:
+        return hashlib.sha1(inF.read()).hexdigest()
+
+
+def oldDatabase(path):
+    # Made before the rollups, only the records table and user_version 0
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE records (task TEXT NOT NULL, start_time INTEGER NOT NULL, end_time INTEGER)")
+    db.executemany("INSERT INTO records VALUES (?, ?, ?)", [("A", 1709280000, 1709294400), ("B", 1709366400, None)])
+    db.commit()
+    db.close()
+
+
+def test_reading_sqlite_leaves_the_database_alone(punchcard, monkeypatch, capsys):
+    pytest.importorskip("numpy")
+    os.makedirs("team")
+    oldDatabase(os.path.join("team", "old.sqlite"))
+    before = digest(os.path.join("team", "old.sqlite"))
+    monkeypatch.setattr(punchcard, "SAVE_FILE", os.path.join("team", "old.sqlite"))
+    for args in (["List", "Tasks"], ["Calc", "Hours", "A"], ["Print", "Summary", "A"], ["Report", "Team", "team"]):
+        punchcard.TaskManager().run(args)
+    output = capsys.readouterr().out
+    assert "Total = 4.00 Hrs." in output
+    assert '"A" = 4.00 Hrs.' in output
+    assert digest(os.path.join("team", "old.sqlite")) == before
+    db = sqlite3.connect(os.path.join("team", "old.sqlite"))
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] != "wal"
+
+
+def test_punching_migrates_sqlite(punchcard, monkeypatch):
+    oldDatabase("old.sqlite")
+    monkeypatch.setattr(punchcard, "SAVE_FILE", "old.sqlite")
+    punchcard.TaskManager().run(["Punch", "out", "B", "2024-03-02T12:00:00"])
+    store = punchcard.SqliteTaskStore("old.sqlite")
+    assert store.Rollups
+    assert store.workedSeconds("B") == 4 * 3600
+    store.close()
+
+
+def test_reading_missing_sqlite_makes_nothing(punchcard, monkeypatch, capsys):
+    monkeypatch.setattr(punchcard, "SAVE_FILE", "new.sqlite")
+    punchcard.TaskManager().run(["List", "Tasks"])
+    assert "Error" not in capsys.readouterr().out
+    assert not os.path.exists("new.sqlite")
+
+
+def test_json_store_finds_one_task_without_parsing_the_rest(punchcard, monkeypatch):
+    root = [{"TaskName": "A", "TaskStart": "2024-03-01T08:00:00", "TaskEnd": "2024-03-01T12:00:00"},
+            {"TaskName": "B", "TaskStart": "2024-03-02T09:00:00", "TaskEnd": None},
+            {"TaskName": "A", "TaskStart": "bogus", "TaskEnd": None}]
+    with open("save.json", 'w') as outF:
+        json.dump(root, outF)
+    store = punchcard.JsonTaskStore("save.json")
+    monkeypatch.setattr(punchcard.TaskManager, "iterJsonRecords", None) # Any full parse fails
+    errorList = []
+    assert store.hasTask("A")
+    assert [record[1:] for record in store.records("A", errorList=errorList)] == [(1709280000, 1709294400)]
+    assert len(errorList) == 1
+    assert not store.hasTask("C")
+
+
+def test_convert_round_trips_through_every_store(punchcard, capsys):
+    for args in (["Punch", "in", "A", "2024-03-01T08:00:00"], ["Punch", "out", "A", "2024-03-01T12:00:00"],
+                 ["Punch", "in", "B {x}", "2024-03-02T09:00:00"], ["Compact"]):
+        punchcard.TaskManager().run(args)
+    for args in (["Convert", punchcard.SAVE_FILE, "h.sqlite"], ["Convert", "h.sqlite", "h.ppcb"], ["Convert", "h.ppcb", "back.json"]):
+        punchcard.TaskManager().run(args)
+    assert "Error" not in capsys.readouterr().out
+    with open(punchcard.SAVE_FILE) as a, open("back.json") as b:
+        assert json.load(a) == json.load(b)
+
+
+def test_convert_refuses_to_drop_records(punchcard, capsys):
+    with open("bad.json", 'w') as outF:
+        json.dump([{"TaskName": "A", "TaskStart": "2024-03-01T08:00:00", "TaskEnd": None}, {"TaskName": "A"}], outF)
+    punchcard.TaskManager().run(["Convert", "bad.json", "bad.ppcb"])
+    assert "Conversion Error" in capsys.readouterr().out
+    assert not os.path.exists("bad.ppcb")
+
+
+HISTORY = {"A": [(1709280000, 1709294400), (1709200000, 1709203600), (1709366400, None)],
+           "B \u00e9": [(1709290000, 1709290000), (1709290000, 1709300000)],
+           "C": []}
+
+
+def test_binary_store_round_trips(punchcard):
+    punchcard.BinaryTaskStore.write("h.ppcb", HISTORY, 7)
+    with punchcard.BinaryTaskStore("h.ppcb") as store:
+        assert store.names() == list(HISTORY)
+        assert store.generation() == 7
+        assert store.taskRecords() == {name: sorted(rows) for name, rows in HISTORY.items() if rows}
+        assert store.hasTask("B \u00e9") and not store.hasTask("D")
+
+
+def test_binary_store_ranges_match_filtering(punchcard):
+    punchcard.BinaryTaskStore.write("h.ppcb", HISTORY)
+    bounds = [None, 0, 1709200000, 1709200001, 1709280000, 1709290000, 1709290001, 1709366400, 1709366401, 2 ** 40]
+    with punchcard.BinaryTaskStore("h.ppcb") as store:
+        for name in list(HISTORY) + ["D"]:
+            for since in bounds:
+                for until in bounds:
+                    expected = [(name, start, end) for start, end in sorted(HISTORY.get(name, []))
+                                if (since is None or start >= since) and (until is None or start < until)]
+                    assert list(store.records(name, since, until)) == expected, (name, since, until)
+        assert list(store.records(None, 1709280000, 1709366400)) == [("A", 1709280000, 1709294400), ("B \u00e9", 1709290000, 1709290000),
+                                                                    ("B \u00e9", 1709290000, 1709300000)]
+
+
+def randomRecords(seed=1234):
+    # { TaskName: [ (start epoch, end epoch or None) ] } in no particular order, some running past midnight or for days
+    rng = random.Random(seed)
+    records = {}
+    for name in ("A", "B"):
+        rows = []
+        for _ in range(60):
+            start = 1709280000 + rng.randrange(60 * 86400)
+            rows.append((start, start + rng.choice([rng.randrange(8 * 3600), rng.randrange(3 * 86400)])))
+        records[name] = rows
+    records["B"].append((1709280000 + 61 * 86400, None))
+    return records
+
+
+def assertSameStats(actual, expected):
+    assert (actual.Count, actual.Open, actual.Days, actual.Through) == (expected.Count, expected.Open, expected.Days, expected.Through)
+    for field in ("Total", "Mean", "M2", "StartSin", "StartCos", "EndSin", "EndCos"):
+        assert getattr(actual, field) == pytest.approx(getattr(expected, field)), field
+
+
+def test_sqlite_rollups_match_task_stats(punchcard):
+    records = randomRecords()
+    with punchcard.SqliteTaskStore("punched.sqlite", True) as store:
+        # Punched one at a time in the order they came, older records get filled in after newer ones
+        for name, rows in records.items():
+            for start, end in rows:
+                store.punchIn(name, start)
+                if end is not None:
+                    store.punchOut(name, end)
+    punchcard.SqliteTaskStore.write("written.sqlite", records)
+    midnights = [None] + [1709251200 + day * 86400 for day in range(0, 70, 3)]
+    now = 1709280000 + 62 * 86400
+    for path in ("punched.sqlite", "written.sqlite"):
+        with punchcard.SqliteTaskStore(path) as store:
+            for name, rows in records.items():
+                expected = punchcard.TaskStats.from_epochs(sorted(rows))
+                assertSameStats(store.stats(name), expected)
+                for since in midnights:
+                    for until in midnights:
+                        if since is None or until is None or since <= until:
+                            assert store.workedSeconds(name, since, until, now) == expected.worked_seconds(since, until, now), (path, name, since, until)
+
+
+def test_sqlite_summaries_match_json(punchcard, monkeypatch):
+    class FrozenDateTime(punchcard.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2024, 5, 2, 12, 0, 0) # A day into the running record
+
+    monkeypatch.setattr(punchcard, "datetime", FrozenDateTime)
+    records = randomRecords()
+    punchcard.JsonTaskStore.write("history.json", records)
+    punchcard.SqliteTaskStore.write("history.sqlite", records)
+    summaries = []
+    for path in ("history.json", "history.sqlite"):
+        tm = punchcard.TaskManager()
+        tm.load(path)
+        summaries.append([tm.getTaskSummary(name) for name in records])
+        tm.Store.close()
+    assert summaries[0] == summaries[1]